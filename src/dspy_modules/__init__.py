@@ -1,15 +1,26 @@
 """DSPy modules for Instagram chatbot functionality."""
 
-from .signatures import BasicQA, GeneralQA, MessageClassifier, EntityExtractor
-from .modules import ContextQA, GeneralKnowledgeQA, MessageIntentClassifier, MessageEntityExtractor
+from .signatures import BasicQA, GeneralQA, MessageClassifier, EntityExtractor, MessageAnalyze
+from .modules import (
+    ContextQA, GeneralKnowledgeQA, MessageIntentClassifier, MessageEntityExtractor, MessageAnalyzer,
+    QAResult, ClassificationResult, EntitiesResult, AnalysisResult
+)
+from .cache import SemanticCache
 
 __all__ = [
     'BasicQA',
     'GeneralQA',
     'MessageClassifier',
     'EntityExtractor',
+    'MessageAnalyze',
     'ContextQA',
     'GeneralKnowledgeQA',
     'MessageIntentClassifier',
     'MessageEntityExtractor',
+    'MessageAnalyzer',
+    'QAResult',
+    'ClassificationResult',
+    'EntitiesResult',
+    'AnalysisResult',
+    'SemanticCache',
 ]
@@ -0,0 +1,214 @@
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Any, Hashable, Optional, TYPE_CHECKING
+
+# For type hints with forward references
+if TYPE_CHECKING:
+    from src.rag.embeddings import EmbeddingGenerator
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """
+    Exact-match cache of module results with least-recently-used eviction.
+    """
+
+    def __init__(self, maxsize: int = 2048):
+        """
+        Initialize the LRU cache.
+
+        Args:
+            maxsize: Maximum number of entries to keep; 0 disables the cache
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # forward_batch calls modules from worker threads
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Cache key, e.g. the module inputs
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store a result, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key, e.g. the module inputs
+            value: Result to cache
+        """
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class _Namespace:
+    """Entries of one SemanticCache namespace, oldest first."""
+    __slots__ = ("embeddings", "values", "matrix")
+
+    def __init__(self):
+        self.embeddings: List[np.ndarray] = []
+        self.values: List[Any] = []
+        # Stacked embeddings, rebuilt on the first lookup after a change
+        self.matrix: Optional[np.ndarray] = None
+
+class SemanticCache:
+    """
+    Caches module results keyed on the embedding of their input text.
+
+    A lookup returns the stored result of the most similar previous input when
+    its cosine similarity is above the threshold, so near-duplicate questions
+    are answered without another LLM round-trip. Entries are grouped in
+    namespaces that never match each other, e.g. one per module, and the
+    cache as a whole holds at most max_entries entries.
+    """
+
+    def __init__(
+        self,
+        embedding_generator: Optional["EmbeddingGenerator"] = None,
+        threshold: float = 0.92,
+        max_entries: int = 1024
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            embedding_generator: Embedding generator used to embed cache keys
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of entries kept across all namespaces; 0 disables the cache
+        """
+        if embedding_generator is None:
+            # Imported lazily so the DSPy modules don't load the embedding stack unless caching is used
+            from src.rag.embeddings import EmbeddingGenerator
+            embedding_generator = EmbeddingGenerator(normalize_embeddings=True)
+
+        self.embedding_generator = embedding_generator
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Namespaces in least-recently-used order; eviction starts with the first one
+        self._namespaces: "OrderedDict[Hashable, _Namespace]" = OrderedDict()
+        self._size = 0
+        # forward_batch calls modules from worker threads
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a cache key.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Unit-length embedding as numpy array
+        """
+        embedding = np.asarray(self.embedding_generator.generate_embedding(text), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def get(
+        self,
+        embedding: np.ndarray,
+        namespace: Hashable = None,
+        threshold: Optional[float] = None
+    ) -> Optional[Any]:
+        """
+        Look up the result stored for the most similar cached input.
+
+        Args:
+            embedding: Embedding of the input, as returned by `embed`
+            namespace: Namespace to search, e.g. the module and a digest of its context
+            threshold: Override the cache's similarity threshold
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if entries is None:
+                return None
+            self._namespaces.move_to_end(namespace)
+
+            if entries.matrix is None:
+                entries.matrix = np.vstack(entries.embeddings)
+
+            similarities = entries.matrix @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= (self.threshold if threshold is None else threshold):
+                return entries.values[best]
+            return None
+
+    def put(self, embedding: np.ndarray, value: Any, namespace: Hashable = None):
+        """
+        Store a result for an input embedding.
+
+        When the cache is full, the oldest entry of the least recently used
+        namespace is evicted first.
+
+        Args:
+            embedding: Embedding of the input, as returned by `embed`
+            value: Result to cache
+            namespace: Namespace to store the entry in
+        """
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if namespace in self._namespaces:
+                self._namespaces.move_to_end(namespace)
+            while self._size >= self.max_entries:
+                self._evict_oldest()
+
+            # Created after eviction, which may have emptied and dropped the namespace
+            entries = self._namespaces.get(namespace)
+            if entries is None:
+                entries = self._namespaces[namespace] = _Namespace()
+
+            entries.embeddings.append(embedding)
+            entries.values.append(value)
+            entries.matrix = None
+            self._size += 1
+
+    def _evict_oldest(self):
+        """Drop the oldest entry of the least recently used namespace; the lock must be held."""
+        namespace, entries = next(iter(self._namespaces.items()))
+        entries.embeddings.pop(0)
+        entries.values.pop(0)
+        entries.matrix = None
+        self._size -= 1
+        if not entries.values:
+            del self._namespaces[namespace]
+
+    def clear(self):
+        """Remove all cached entries."""
+        with self._lock:
+            self._namespaces.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
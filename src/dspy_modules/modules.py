@@ -1,18 +1,285 @@
 import dspy
-import json
-from typing import Optional, Dict, Any, List
+import asyncio
+import hashlib
+import logging
+import orjson
+import contextvars
+from dataclasses import dataclass, fields
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator, Union
+from dspy.streaming import StreamListener, StreamResponse
+
+from .signatures import BasicQA, GeneralQA, MessageClassifier, EntityExtractor, MessageAnalyze
+from .cache import LRUCache, SemanticCache
+
+logger = logging.getLogger(__name__)
+
+# Answers accepted as "yes" for boolean output fields
+_YES = frozenset({"yes", "y", "true", "1"})
+
+# Model prefixes of providers that accept OpenAI's Predicted Outputs hint
+_PREDICTED_OUTPUT_PROVIDERS = ("openai/", "azure/", "gpt-")
+
+# Bare greetings and acknowledgements, answered without an LLM call
+_SMALL_TALK_INTENTS = {
+    "hi": "greeting", "hi there": "greeting", "hello": "greeting", "hello there": "greeting",
+    "hey": "greeting", "hey there": "greeting", "hiya": "greeting", "good morning": "greeting",
+    "good afternoon": "greeting", "good evening": "greeting",
+    "thanks": "acknowledgement", "thank you": "acknowledgement", "thx": "acknowledgement",
+    "ty": "acknowledgement", "ok": "acknowledgement", "okay": "acknowledgement",
+    "bye": "farewell", "goodbye": "farewell",
+}
+
+# Entity lists in the order they appear in the result classes
+_ENTITY_KEYS = ("locations", "people", "dates", "topics", "keywords")
+
+# Contexts longer than this are not sent as a predicted output
+_MAX_PREDICTED_OUTPUT_CHARS = 8192
+
+class _ResultAccess:
+    """Dict-style read access to result fields, for callers written against the old dict results."""
+    __slots__ = ()
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__dataclass_fields__
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__dataclass_fields__ else default
+    
+    def keys(self) -> List[str]:
+        return [field.name for field in fields(self)]
+
+@dataclass(slots=True, frozen=True)
+class QAResult(_ResultAccess):
+    """Result of ContextQA and GeneralKnowledgeQA."""
+    answer: str
+    full_result: Any
+
+@dataclass(slots=True, frozen=True)
+class ClassificationResult(_ResultAccess):
+    """Result of MessageIntentClassifier."""
+    intent: str
+    category: str
+    requires_context: bool
+    full_result: Any
+
+@dataclass(slots=True, frozen=True)
+class EntitiesResult(_ResultAccess):
+    """Result of MessageEntityExtractor."""
+    locations: List[str]
+    people: List[str]
+    dates: List[str]
+    topics: List[str]
+    keywords: List[str]
+    full_result: Any
+
+@dataclass(slots=True, frozen=True)
+class AnalysisResult(_ResultAccess):
+    """Result of MessageAnalyzer."""
+    intent: str
+    category: str
+    requires_context: bool
+    locations: List[str]
+    people: List[str]
+    dates: List[str]
+    topics: List[str]
+    keywords: List[str]
+    full_result: Any
+    
+    def classification(self) -> ClassificationResult:
+        """Return the MessageIntentClassifier view of this result."""
+        return ClassificationResult(self.intent, self.category, self.requires_context, self.full_result)
+    
+    def entities(self) -> EntitiesResult:
+        """Return the MessageEntityExtractor view of this result."""
+        return EntitiesResult(
+            self.locations, self.people, self.dates, self.topics, self.keywords, self.full_result
+        )
+
+def _max_concurrency(num_threads: Optional[int], num_inputs: int) -> int:
+    """Cap concurrent calls at num_threads, defaulting to dspy.settings.num_threads, and at the batch size."""
+    return max(1, min(num_threads or dspy.settings.num_threads or 1, num_inputs))
+
+def _run_concurrently(
+    module: dspy.Module,
+    inputs: List[Dict[str, Any]],
+    num_threads: Optional[int] = None
+) -> List[Any]:
+    """
+    Call a module once per input on a thread pool so the LLM calls overlap.
+    
+    Args:
+        module: The DSPy module to call
+        inputs: Keyword arguments for each call
+        num_threads: Maximum number of concurrent calls (defaults to dspy.settings.num_threads)
+        
+    Returns:
+        List of results, in the same order as the inputs
+    """
+    if not inputs:
+        return []
+    
+    # Run each call in a copy of the caller's context so dspy.context() overrides still apply
+    contexts = [contextvars.copy_context() for _ in inputs]
+    
+    def call(context, kwargs):
+        return context.run(module, **kwargs)
+    
+    with ThreadPoolExecutor(max_workers=_max_concurrency(num_threads, len(inputs))) as executor:
+        return list(executor.map(call, contexts, inputs))
+
+async def _arun_concurrently(
+    module: dspy.Module,
+    inputs: List[Dict[str, Any]],
+    num_threads: Optional[int] = None
+) -> List[Any]:
+    """
+    Call a module once per input in worker threads without blocking the event loop.
+    
+    Args:
+        module: The DSPy module to call
+        inputs: Keyword arguments for each call
+        num_threads: Maximum number of concurrent calls (defaults to dspy.settings.num_threads)
+        
+    Returns:
+        List of results, in the same order as the inputs
+    """
+    if not inputs:
+        return []
+    
+    limit = asyncio.Semaphore(_max_concurrency(num_threads, len(inputs)))
+    
+    async def call(kwargs):
+        async with limit:
+            # to_thread runs the call in a copy of the caller's context, keeping dspy.context() overrides
+            return await asyncio.to_thread(module, **kwargs)
+    
+    return list(await asyncio.gather(*(call(kwargs) for kwargs in inputs)))
+
+def _context_digest(context: str) -> bytes:
+    """Digest a context into a collision-resistant semantic cache namespace key."""
+    return hashlib.blake2b(context.encode("utf-8"), digest_size=16).digest()
+
+def _classification_view(result: Union[ClassificationResult, AnalysisResult]) -> ClassificationResult:
+    """Return the classification part of a classifier or analyzer result."""
+    return result.classification() if isinstance(result, AnalysisResult) else result
+
+def _small_talk_intent(message: str) -> Optional[str]:
+    """Return the intent of a bare greeting or acknowledgement, or None for any other message."""
+    return _SMALL_TALK_INTENTS.get(message.strip().rstrip("!.?, ").lower())
+
+def _entity_columns(results: List[EntitiesResult]) -> Dict[str, List[List[str]]]:
+    """Map each entity type to its per-message lists, in input order."""
+    return {key: [getattr(result, key) for result in results] for key in _ENTITY_KEYS}
+
+def _parse_requires_context(value: str) -> bool:
+    """Parse the requires_context output field into a bool."""
+    return value.strip().rstrip(".!").lower() in _YES
+
+def _normalize_entities(values: Any) -> List[str]:
+    """
+    Clean up one entity list emitted by the LLM.
+    
+    Entries are stripped, non-string and empty entries are dropped, and
+    case-insensitive duplicates are removed keeping the first spelling.
+    
+    Args:
+        values: The entity list parsed from the LLM output
+        
+    Returns:
+        The normalized entity list, in the original order
+    """
+    if not isinstance(values, list):
+        return []
+    
+    seen = set()
+    normalized = []
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        value = value.strip()
+        key = value.casefold()
+        if value and key not in seen:
+            seen.add(key)
+            normalized.append(value)
+    return normalized
+
+def _parse_entities(value: str) -> Tuple[List[str], ...]:
+    """
+    Parse the entities output field into its entity lists.
+    
+    Args:
+        value: JSON object emitted by the LLM
+        
+    Returns:
+        Tuple of the locations, people, dates, topics and keywords lists
+    """
+    # Only a JSON object can hold entity lists, so anything else skips the parser
+    if not isinstance(value, str) or value.lstrip()[:1] != "{":
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Entity output is not a JSON object: %r", value)
+        return ([], [], [], [], [])
+    
+    # Parse the JSON object holding all entity lists in one pass
+    try:
+        entities = orjson.loads(value)
+    except orjson.JSONDecodeError as e:
+        # Handle parsing errors gracefully; only format the message when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Error parsing entity JSON: %s", e)
+        entities = {}
+    
+    if not isinstance(entities, dict):
+        entities = {}
+    
+    return tuple(_normalize_entities(entities.get(key, [])) for key in _ENTITY_KEYS)
 
-from .signatures import BasicQA, GeneralQA, MessageClassifier, EntityExtractor
 
 class ContextQA(dspy.Module):
     """
     A question answering module that answers questions based on a provided context.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        semantic_cache: Optional[SemanticCache] = None,
+        cache_size: int = 2048,
+        use_predicted_outputs: bool = False
+    ):
         super().__init__()
         self.predictor = dspy.Predict(BasicQA)
+        self.result_cache = LRUCache(maxsize=cache_size)
+        self.semantic_cache = semantic_cache
+        self.use_predicted_outputs = use_predicted_outputs
     
-    def forward(self, context: str, question: str) -> Dict[str, Any]:
+    def _predicted_output_config(self, context: str) -> Dict[str, Any]:
+        """
+        Build the LM config that passes the context as a Predicted Outputs hint.
+        
+        Answers often quote the context, so OpenAI-compatible providers can verify
+        those tokens speculatively instead of decoding them one at a time.
+        
+        Args:
+            context: The context the question is answered from
+            
+        Returns:
+            LM config for the predictor call, empty when the hint does not apply
+        """
+        if not self.use_predicted_outputs or len(context) >= _MAX_PREDICTED_OUTPUT_CHARS:
+            return {}
+        
+        lm = self.predictor.lm or dspy.settings.lm
+        model = getattr(lm, "model", "")
+        if not isinstance(model, str) or not model.startswith(_PREDICTED_OUTPUT_PROVIDERS):
+            return {}
+        
+        return {"prediction": {"type": "content", "content": context}}
+    
+    def forward(self, context: str, question: str) -> QAResult:
         """
         Answer a question based on the provided context.
         
@@ -21,21 +288,70 @@ class ContextQA(dspy.Module):
             question: The question to answer
             
         Returns:
-            Dict containing the answer
+            QAResult containing the answer
+        """
+        key = (context, question)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Questions are only similar within the same context, so each context gets its own namespace
+        if self.semantic_cache is not None:
+            namespace = (type(self).__name__, _context_digest(context))
+            embedding = self.semantic_cache.embed(question)
+            cached = self.semantic_cache.get(embedding, namespace=namespace)
+            if cached is not None:
+                return cached
+        
+        config = self._predicted_output_config(context)
+        if config:
+            prediction = self.predictor(context=context, question=question, config=config)
+        else:
+            prediction = self.predictor(context=context, question=question)
+        result = QAResult(prediction.answer, prediction)
+        
+        self.result_cache.put(key, result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(embedding, result, namespace=namespace)
+        return result
+    
+    def forward_batch(
+        self,
+        contexts: List[str],
+        questions: List[str],
+        num_threads: Optional[int] = None
+    ) -> List[QAResult]:
+        """
+        Answer several questions concurrently, each based on its own context.
+        
+        Args:
+            contexts: The context for each question
+            questions: The questions to answer
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            
+        Returns:
+            List of QAResults containing the answers, in input order
+            
+        Raises:
+            ValueError: If contexts and questions differ in length
         """
-        prediction = self.predictor(context=context, question=question)
-        return {"answer": prediction.answer, "full_result": prediction}
+        return _run_concurrently(self, [
+            {"context": context, "question": question}
+            for context, question in zip(contexts, questions, strict=True)
+        ], num_threads)
 
 
 class GeneralKnowledgeQA(dspy.Module):
     """
     A question answering module that answers general knowledge questions without specific context.
     """
-    def __init__(self):
+    def __init__(self, semantic_cache: Optional[SemanticCache] = None, cache_size: int = 2048):
         super().__init__()
         self.predictor = dspy.Predict(GeneralQA)
+        self.result_cache = LRUCache(maxsize=cache_size)
+        self.semantic_cache = semantic_cache
     
-    def forward(self, question: str) -> Dict[str, Any]:
+    def forward(self, question: str) -> QAResult:
         """
         Answer a general knowledge question.
         
@@ -43,21 +359,60 @@ class GeneralKnowledgeQA(dspy.Module):
             question: The question to answer
             
         Returns:
-            Dict containing the answer
+            QAResult containing the answer
         """
+        cached = self.result_cache.get(question)
+        if cached is not None:
+            return cached
+        
+        if self.semantic_cache is not None:
+            embedding = self.semantic_cache.embed(question)
+            cached = self.semantic_cache.get(embedding, namespace=type(self).__name__)
+            if cached is not None:
+                return cached
+        
         prediction = self.predictor(question=question)
-        return {"answer": prediction.answer, "full_result": prediction}
+        result = QAResult(prediction.answer, prediction)
+        
+        self.result_cache.put(question, result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(embedding, result, namespace=type(self).__name__)
+        return result
+    
+    def forward_batch(self, questions: List[str], num_threads: Optional[int] = None) -> List[QAResult]:
+        """
+        Answer several general knowledge questions concurrently.
+        
+        Args:
+            questions: The questions to answer
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            
+        Returns:
+            List of QAResults containing the answers, in input order
+        """
+        return _run_concurrently(self, [{"question": question} for question in questions], num_threads)
 
 
 class MessageIntentClassifier(dspy.Module):
     """
     A module that classifies messages by intent and extracts key information.
+    
+    When given a MessageAnalyzer, classification is delegated to it so that a
+    MessageEntityExtractor sharing the same analyzer reuses the single LLM call.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        semantic_cache: Optional[SemanticCache] = None,
+        cache_size: int = 2048,
+        analyzer: Optional["MessageAnalyzer"] = None
+    ):
         super().__init__()
         self.predictor = dspy.Predict(MessageClassifier)
+        self.result_cache = LRUCache(maxsize=cache_size)
+        self.semantic_cache = semantic_cache
+        self.analyzer = analyzer
     
-    def forward(self, message: str) -> Dict[str, Any]:
+    def forward(self, message: str) -> ClassificationResult:
         """
         Classify a message by intent and extract key information.
         
@@ -65,27 +420,141 @@ class MessageIntentClassifier(dspy.Module):
             message: The message to classify
             
         Returns:
-            Dict containing the classification results
+            ClassificationResult containing the classification results
         """
+        intent = _small_talk_intent(message)
+        if intent is not None:
+            return ClassificationResult(intent, "social", False, None)
+        
+        if self.analyzer is not None:
+            analysis = self.analyzer(message=message)
+            return analysis.classification()
+        
+        cached = self.result_cache.get(message)
+        if cached is not None:
+            return cached
+        
+        if self.semantic_cache is not None:
+            embedding = self.semantic_cache.embed(message)
+            cached = self.semantic_cache.get(embedding, namespace=type(self).__name__)
+            if cached is not None:
+                return cached
+        
         prediction = self.predictor(message=message)
+        result = self._build_result(prediction)
         
-        return {
-            "intent": prediction.intent,
-            "category": prediction.category,
-            "requires_context": prediction.requires_context.lower() == "yes",
-            "full_result": prediction
-        }
+        self.result_cache.put(message, result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(embedding, result, namespace=type(self).__name__)
+        return result
+    
+    async def astream(self, message: str) -> AsyncIterator[Union[Dict[str, bool], ClassificationResult]]:
+        """
+        Classify a message, yielding requires_context as soon as it is generated.
+        
+        The first item is {"requires_context": bool}, emitted while the rest of
+        the completion is still streaming so callers can start retrieval early.
+        The last item is the full classification result, as returned by forward.
+        
+        Args:
+            message: The message to classify
+            
+        Yields:
+            The early requires_context dict, then the ClassificationResult
+        """
+        # Stream the analyzer's call instead when classification is delegated to it
+        owner = self if self.analyzer is None else self.analyzer
+        
+        namespace = type(owner).__name__
+        embedding = None
+        
+        intent = _small_talk_intent(message)
+        if intent is not None:
+            result = ClassificationResult(intent, "social", False, None)
+        else:
+            result = owner.result_cache.get(message)
+            if result is None and owner.semantic_cache is not None:
+                embedding = owner.semantic_cache.embed(message)
+                result = owner.semantic_cache.get(embedding, namespace=namespace)
+        
+        if result is None:
+            listener = StreamListener(signature_field_name="requires_context", predict=owner.predictor)
+            stream = dspy.streamify(owner.predictor, stream_listeners=[listener])(message=message)
+            
+            chunks = []
+            async for value in stream:
+                if isinstance(value, StreamResponse):
+                    chunks.append(value.chunk)
+                    if value.is_last_chunk:
+                        yield {"requires_context": _parse_requires_context("".join(chunks))}
+                elif isinstance(value, dspy.Prediction):
+                    result = owner._build_result(value)
+                    owner.result_cache.put(message, result)
+                    if embedding is not None:
+                        owner.semantic_cache.put(embedding, result, namespace=namespace)
+            
+            if chunks:
+                yield _classification_view(result)
+                return
+        
+        # Nothing was streamed (small talk or an exact or semantic cache hit), so emit the flag with the result
+        yield {"requires_context": result.requires_context}
+        yield _classification_view(result)
+    
+    def _build_result(self, prediction: dspy.Prediction) -> ClassificationResult:
+        """Build the classification result from a prediction."""
+        return ClassificationResult(
+            prediction.intent,
+            prediction.category,
+            _parse_requires_context(prediction.requires_context),
+            prediction
+        )
+    
+    def forward_batch(self, messages: List[str], num_threads: Optional[int] = None) -> List[ClassificationResult]:
+        """
+        Classify several messages concurrently.
+        
+        Args:
+            messages: The messages to classify
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            
+        Returns:
+            List of ClassificationResults, in input order
+        """
+        return _run_concurrently(self, [{"message": message} for message in messages], num_threads)
+    
+    async def aforward_batch(
+        self,
+        messages: List[str],
+        num_threads: Optional[int] = None
+    ) -> List[ClassificationResult]:
+        """
+        Classify several messages concurrently from async code.
+        
+        Args:
+            messages: The messages to classify
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            
+        Returns:
+            List of ClassificationResults, in input order
+        """
+        return await _arun_concurrently(self, [{"message": message} for message in messages], num_threads)
 
 
 class MessageEntityExtractor(dspy.Module):
     """
     A module that extracts entities from a message such as locations, people, dates, topics and keywords.
+    
+    When given a MessageAnalyzer, extraction is delegated to it so that a
+    MessageIntentClassifier sharing the same analyzer reuses the single LLM call.
     """
-    def __init__(self):
+    def __init__(self, cache_size: int = 2048, analyzer: Optional["MessageAnalyzer"] = None):
         super().__init__()
         self.predictor = dspy.Predict(EntityExtractor)
+        self.result_cache = LRUCache(maxsize=cache_size)
+        self.analyzer = analyzer
     
-    def forward(self, message: str) -> Dict[str, Any]:
+    def forward(self, message: str) -> EntitiesResult:
         """
         Extract entities from a message.
         
@@ -93,31 +562,131 @@ class MessageEntityExtractor(dspy.Module):
             message: The message to extract entities from
             
         Returns:
-            Dict containing the extracted entities
+            EntitiesResult containing the extracted entities
+        """
+        # Blank messages and bare greetings have no entities to extract
+        if not message.strip() or _small_talk_intent(message) is not None:
+            return EntitiesResult([], [], [], [], [], None)
+        
+        if self.analyzer is not None:
+            analysis = self.analyzer(message=message)
+            return analysis.entities()
+        
+        # Cached results are already parsed, so hits skip the JSON decoding too
+        cached = self.result_cache.get(message)
+        if cached is not None:
+            return cached
+        
+        prediction = self.predictor(message=message)
+        
+        result = EntitiesResult(*_parse_entities(prediction.entities), prediction)
+        
+        self.result_cache.put(message, result)
+        return result
+    
+    def forward_batch(
+        self,
+        messages: List[str],
+        num_threads: Optional[int] = None,
+        columnar: bool = False
+    ) -> Union[List[EntitiesResult], Dict[str, List[List[str]]]]:
+        """
+        Extract entities from several messages concurrently.
+        
+        Args:
+            messages: The messages to extract entities from
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            columnar: Return one column per entity type instead of one result per message
+            
+        Returns:
+            List of EntitiesResults in input order, or when columnar is set a dict
+            mapping each entity type to the per-message lists, in input order
         """
+        results = _run_concurrently(self, [{"message": message} for message in messages], num_threads)
+        return _entity_columns(results) if columnar else results
+    
+    async def aforward_batch(
+        self,
+        messages: List[str],
+        num_threads: Optional[int] = None,
+        columnar: bool = False
+    ) -> Union[List[EntitiesResult], Dict[str, List[List[str]]]]:
+        """
+        Extract entities from several messages concurrently from async code.
+        
+        Args:
+            messages: The messages to extract entities from
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            columnar: Return one column per entity type instead of one result per message
+            
+        Returns:
+            List of EntitiesResults in input order, or the columns as in forward_batch
+        """
+        results = await _arun_concurrently(self, [{"message": message} for message in messages], num_threads)
+        return _entity_columns(results) if columnar else results
+
+
+class MessageAnalyzer(dspy.Module):
+    """
+    A module that classifies a message and extracts its entities in a single LLM call.
+    """
+    def __init__(self, semantic_cache: Optional[SemanticCache] = None, cache_size: int = 2048):
+        super().__init__()
+        self.predictor = dspy.Predict(MessageAnalyze)
+        self.result_cache = LRUCache(maxsize=cache_size)
+        self.semantic_cache = semantic_cache
+    
+    def forward(self, message: str) -> AnalysisResult:
+        """
+        Classify a message and extract its entities.
+        
+        Args:
+            message: The message to analyze
+            
+        Returns:
+            AnalysisResult containing the classification results and the extracted entities
+        """
+        intent = _small_talk_intent(message)
+        if intent is not None:
+            return AnalysisResult(intent, "social", False, [], [], [], [], [], None)
+        
+        cached = self.result_cache.get(message)
+        if cached is not None:
+            return cached
+        
+        if self.semantic_cache is not None:
+            embedding = self.semantic_cache.embed(message)
+            cached = self.semantic_cache.get(embedding, namespace=type(self).__name__)
+            if cached is not None:
+                return cached
+        
         prediction = self.predictor(message=message)
+        result = self._build_result(prediction)
+        
+        self.result_cache.put(message, result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.put(embedding, result, namespace=type(self).__name__)
+        return result
+    
+    def _build_result(self, prediction: dspy.Prediction) -> AnalysisResult:
+        """Build the analysis result from a prediction."""
+        return AnalysisResult(
+            prediction.intent,
+            prediction.category,
+            _parse_requires_context(prediction.requires_context),
+            *_parse_entities(prediction.entities),
+            prediction
+        )
+    
+    def forward_batch(self, messages: List[str], num_threads: Optional[int] = None) -> List[AnalysisResult]:
+        """
+        Analyze several messages concurrently.
         
-        # Parse JSON strings into Python lists
-        try:
-            locations = json.loads(prediction.locations)
-            people = json.loads(prediction.people)
-            dates = json.loads(prediction.dates)
-            topics = json.loads(prediction.topics)
-            keywords = json.loads(prediction.keywords)
-        except json.JSONDecodeError as e:
-            # Handle parsing errors gracefully
-            print(f"Error parsing entity JSON: {e}")
-            locations = []
-            people = []
-            dates = []
-            topics = []
-            keywords = []
-            
-        return {
-            "locations": locations,
-            "people": people,
-            "dates": dates,
-            "topics": topics,
-            "keywords": keywords,
-            "full_result": prediction
-        }
+        Args:
+            messages: The messages to analyze
+            num_threads: Maximum number of concurrent LLM calls (defaults to dspy.settings.num_threads)
+            
+        Returns:
+            List of AnalysisResults, in input order
+        """
+        return _run_concurrently(self, [{"message": message} for message in messages], num_threads)
@@ -1,28 +1,42 @@
+import sys
 import dspy
 
+# Field descriptions shared between signatures
+_QUESTION_DESC = sys.intern("Question that needs to be answered")
+_INTENT_DESC = sys.intern("The intent of the message (question, greeting, request, etc.)")
+_CATEGORY_DESC = sys.intern("The category or topic of the message (travel, personal, technical, etc.)")
+_REQUIRES_CONTEXT_DESC = sys.intern("Single token: Y if additional context is needed to properly respond, otherwise N")
+_ENTITIES_DESC = sys.intern("JSON object with keys locations, people, dates, topics, keywords, each a JSON array of the locations, people, dates or time references, topics or subjects, and important keywords mentioned in the message. Use an empty array for a key if none are found.")
+
 class BasicQA(dspy.Signature):
     """Answer questions based on the provided context."""
     context = dspy.InputField(desc="Context information to answer the question")
-    question = dspy.InputField(desc="Question that needs to be answered")
+    question = dspy.InputField(desc=_QUESTION_DESC)
     answer = dspy.OutputField(desc="Answer to the question based on the context provided")
     
 class GeneralQA(dspy.Signature):
     """Answer general questions without specific context."""
-    question = dspy.InputField(desc="Question that needs to be answered")
+    question = dspy.InputField(desc=_QUESTION_DESC)
     answer = dspy.OutputField(desc="Answer to the question based on the model's knowledge")
 
 class MessageClassifier(dspy.Signature):
     """Classify messages by intent and extract key information."""
     message = dspy.InputField(desc="The message text to classify")
-    intent = dspy.OutputField(desc="The intent of the message (question, greeting, request, etc.)")
-    category = dspy.OutputField(desc="The category or topic of the message (travel, personal, technical, etc.)")
-    requires_context = dspy.OutputField(desc="Whether additional context is needed to properly respond (yes/no)")
+    # Generated first so streaming callers can start retrieval before the rest of the completion
+    requires_context = dspy.OutputField(desc=_REQUIRES_CONTEXT_DESC)
+    intent = dspy.OutputField(desc=_INTENT_DESC)
+    category = dspy.OutputField(desc=_CATEGORY_DESC)
 
 class EntityExtractor(dspy.Signature):
     """Extract entities from a message."""
     message = dspy.InputField(desc="The message text to extract entities from")
-    locations = dspy.OutputField(desc="List of locations mentioned in the message, in JSON array format. Empty array if none found.")
-    people = dspy.OutputField(desc="List of people mentioned in the message, in JSON array format. Empty array if none found.")
-    dates = dspy.OutputField(desc="List of dates or time references mentioned in the message, in JSON array format. Empty array if none found.")
-    topics = dspy.OutputField(desc="List of topics or subjects mentioned in the message, in JSON array format. Empty array if none found.")
-    keywords = dspy.OutputField(desc="List of important keywords from the message, in JSON array format. Empty array if none found.")
+    entities = dspy.OutputField(desc=_ENTITIES_DESC)
+
+class MessageAnalyze(dspy.Signature):
+    """Classify a message by intent and extract its entities."""
+    message = dspy.InputField(desc="The message text to analyze")
+    # Generated first, as in MessageClassifier, so MessageIntentClassifier.astream can stream it early
+    requires_context = dspy.OutputField(desc=_REQUIRES_CONTEXT_DESC)
+    intent = dspy.OutputField(desc=_INTENT_DESC)
+    category = dspy.OutputField(desc=_CATEGORY_DESC)
+    entities = dspy.OutputField(desc=_ENTITIES_DESC)
\ No newline at end of file
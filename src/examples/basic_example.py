@@ -1,16 +1,11 @@
-import os
-import sys
 import dspy
 
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
 from src.utils.setup import init_dspy
 
 def main():
     """Simple example to demonstrate DSPy with Anthropic Claude"""
     # Initialize DSPy with Claude
-    llm = init_dspy(verbose=True)
+    llm = init_dspy()
     
     # Define a simple signature for question answering
     class SimpleQA(dspy.Signature):
@@ -1,11 +1,6 @@
-import os
-import sys
 import dspy
 import json
 
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
 from src.utils.setup import init_dspy
 from src.dspy_modules import MessageEntityExtractor
 
@@ -35,11 +30,12 @@ def test_entity_extractor():
         "I'm organizing a hiking trip to Mount Everest with Sarah and David next spring."
     ]
     
-    for i, message in enumerate(messages):
+    # Extract entities from all messages on a thread pool, then print the results in order
+    results = extractor.forward_batch(messages, num_threads=10)
+    
+    for i, (message, result) in enumerate(zip(messages, results)):
         print(f"\n[{i+1}] Message: \"{message}\"")
         
-        result = extractor(message=message)
-        
         print("Locations:", format_entities(result["locations"], "locations"))
         print("People:", format_entities(result["people"], "people"))
         print("Dates:", format_entities(result["dates"], "dates"))
@@ -49,7 +45,7 @@ def test_entity_extractor():
 def main():
     """Run example of the entity extractor module."""
     # Initialize DSPy with Claude
-    init_dspy(verbose=True)
+    init_dspy()
     
     # Test the entity extractor
     test_entity_extractor()
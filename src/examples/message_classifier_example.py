@@ -1,10 +1,5 @@
-import os
-import sys
 import dspy
 
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-
 from src.utils.setup import init_dspy
 from src.dspy_modules import MessageIntentClassifier
 
@@ -28,11 +23,12 @@ def test_message_classifier():
         "When is the best time to visit Japan?"
     ]
     
-    for i, message in enumerate(messages):
+    # Classify all messages on a thread pool, then print the results in order
+    results = classifier.forward_batch(messages, num_threads=10)
+    
+    for i, (message, result) in enumerate(zip(messages, results)):
         print(f"\n[{i+1}] Message: \"{message}\"")
         
-        result = classifier(message=message)
-        
         print(f"Intent: {result['intent']}")
         print(f"Category: {result['category']}")
         print(f"Requires Context: {'Yes' if result['requires_context'] else 'No'}")
@@ -40,7 +36,7 @@ def test_message_classifier():
 def main():
     """Run example of the message classifier module."""
     # Initialize DSPy with Claude
-    init_dspy(verbose=True)
+    init_dspy()
     
     # Test the message classifier
     test_message_classifier()
@@ -1,84 +1,79 @@
-import os
-import sys
 import dspy
-
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+import asyncio
 
 from src.utils.setup import init_dspy
 from src.dspy_modules import ContextQA, GeneralKnowledgeQA
 
-def test_context_qa():
+async def test_context_qa():
     """Test the ContextQA module with a sample context and question."""
     print("\n----- Testing ContextQA Module -----")
     
     context_qa = ContextQA()
     
-    # Example 1: Simple factual QA
-    context = """
+    examples = [
+        # Example 1: Simple factual QA
+        (
+            """
     The Golden Gate Bridge is a suspension bridge spanning the Golden Gate, 
     the one-mile-wide strait connecting San Francisco Bay and the Pacific Ocean. 
     The structure links the U.S. city of San Francisco, California—the northern tip of 
     the San Francisco Peninsula—to Marin County. It was opened in 1937 and had the world's 
     longest suspension bridge main span at that time.
-    """
-    question = "When was the Golden Gate Bridge opened?"
-    
-    print(f"Context: {context.strip()}")
-    print(f"Question: {question}")
-    
-    result = context_qa(context=context, question=question)
-    
-    print(f"Answer: {result['answer']}")
-    
-    # Example 2: Reasoning QA
-    context = """
+    """,
+            "When was the Golden Gate Bridge opened?"
+        ),
+        # Example 2: Reasoning QA
+        (
+            """
     Alice is 5 years older than Bob. Bob is 3 years younger than Charlie.
     Charlie is 10 years old.
-    """
-    question = "How old is Alice?"
-    
-    print("\n")
-    print(f"Context: {context.strip()}")
-    print(f"Question: {question}")
-    
-    result = context_qa(context=context, question=question)
-    
-    print(f"Answer: {result['answer']}")
-    
-def test_general_qa():
+    """,
+            "How old is Alice?"
+        )
+    ]
+    
+    # Answer all questions concurrently, then print the results in order
+    async_context_qa = dspy.asyncify(context_qa)
+    results = await asyncio.gather(*[async_context_qa(context=c, question=q) for c, q in examples])
+    
+    for i, ((context, question), result) in enumerate(zip(examples, results)):
+        if i > 0:
+            print("\n")
+        print(f"Context: {context.strip()}")
+        print(f"Question: {question}")
+        print(f"Answer: {result['answer']}")
+    
+async def test_general_qa():
     """Test the GeneralKnowledgeQA module with sample questions."""
     print("\n----- Testing GeneralKnowledgeQA Module -----")
     
     general_qa = GeneralKnowledgeQA()
     
-    # Example 1: General knowledge question
-    question = "What is the capital of France?"
-    
-    print(f"Question: {question}")
-    
-    result = general_qa(question=question)
-    
-    print(f"Answer: {result['answer']}")
-    
-    # Example 2: More complex question
-    question = "How does photosynthesis work?"
-    
-    print("\n")
-    print(f"Question: {question}")
-    
-    result = general_qa(question=question)
-    
-    print(f"Answer: {result['answer']}")
+    questions = [
+        # Example 1: General knowledge question
+        "What is the capital of France?",
+        # Example 2: More complex question
+        "How does photosynthesis work?"
+    ]
+    
+    # Answer all questions concurrently, then print the results in order
+    async_general_qa = dspy.asyncify(general_qa)
+    results = await asyncio.gather(*[async_general_qa(question=q) for q in questions])
+    
+    for i, (question, result) in enumerate(zip(questions, results)):
+        if i > 0:
+            print("\n")
+        print(f"Question: {question}")
+        print(f"Answer: {result['answer']}")
 
 def main():
     """Run examples of the QA modules."""
     # Initialize DSPy with Claude
-    init_dspy(verbose=True)
+    init_dspy()
     
     # Test the QA modules
-    test_context_qa()
-    test_general_qa()
+    asyncio.run(test_context_qa())
+    asyncio.run(test_general_qa())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -6,7 +6,7 @@ documents from a knowledge base to augment LLM responses with external knowledge
 """
 
 from .document_processor import Document, DocumentChunk, DocumentLoader, DocumentChunker, MetadataExtractor
-from .embeddings import EmbeddingGenerator
+from .embeddings import EmbeddingGenerator, EmbeddingCache
 from .indexer import VectorStoreIndexer
 from .retriever import QueryTransformer, Retriever
 
@@ -17,6 +17,7 @@ __all__ = [
     'DocumentChunker',
     'MetadataExtractor',
     'EmbeddingGenerator',
+    'EmbeddingCache',
     'VectorStoreIndexer',
     'QueryTransformer',
     'Retriever',
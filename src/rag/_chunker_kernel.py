@@ -0,0 +1,59 @@
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _pack_sections(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    first: int,
+    stop: int,
+    chunk_size: int,
+    chunk_overlap: int
+) -> np.ndarray:
+    """
+    Group consecutive sections into chunks of at most chunk_size characters.
+    
+    Args:
+        starts: Start offset of each section in the text
+        ends: End offset of each section in the text
+        first: Index of the first section to pack
+        stop: Index one past the last section to pack
+        chunk_size: Maximum chunk size in characters
+        chunk_overlap: Maximum number of trailing characters repeated at the start of the next chunk
+        
+    Returns:
+        (n_chunks, 2) array of [first, last] section indices (inclusive) for each chunk
+    """
+    bounds = np.empty((max(stop - first, 0), 2), dtype=np.int64)
+    n_chunks = 0
+    i = first
+    while i < stop:
+        j = min(np.searchsorted(ends, starts[i] + chunk_size, side='right'), stop)
+        bounds[n_chunks, 0] = i
+        bounds[n_chunks, 1] = j - 1
+        n_chunks += 1
+        
+        if j == stop:
+            break
+        
+        # Start the next chunk with the trailing sections that fit in the overlap,
+        # as long as the next chunk can still take in section j
+        next_start = j
+        if chunk_overlap > 0:
+            k = max(np.searchsorted(starts, ends[j - 1] - chunk_overlap, side='left'), i + 1)
+            if k < j and ends[j] - starts[k] <= chunk_size:
+                next_start = k
+        i = next_start
+    
+    return bounds[:n_chunks]
+
+if NUMBA_AVAILABLE:
+    pack_sections = njit(cache=True)(_pack_sections)
+    # Compile once at import instead of on the first document
+    pack_sections(np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), 0, 1, 1, 0)
+else:
+    pack_sections = _pack_sections
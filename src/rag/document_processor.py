@@ -1,14 +1,33 @@
 import os
+import mmap
 import yaml
 import json
+import orjson
 import logging
 import markdown
-from typing import Dict, List, Union, Any, Optional, Tuple, TYPE_CHECKING
-from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Union, Any, Optional, Tuple, Iterator, Mapping, TYPE_CHECKING
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from types import MappingProxyType
 import re
+import bisect
 import hashlib
+import functools
+import itertools
 import tiktoken
+import numpy as np
+
+from ._chunker_kernel import pack_sections
+
+# Use the libyaml C parser when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+    LIBYAML_AVAILABLE = False
 
 # Use TYPE_CHECKING to prevent circular imports
 if TYPE_CHECKING:
@@ -16,18 +35,71 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+if not LIBYAML_AVAILABLE:
+    logger.warning("libyaml bindings are not available; YAML documents will be parsed with the slower pure-Python loader")
+
+# Characters of content encoded per hash update
+_HASH_SLICE_CHARS = 1 << 20
+
+def content_hash(content: str) -> str:
+    """
+    Hash text content into a 32-character hex digest.
+    
+    Uses 16-byte BLAKE2b from the standard library, so document IDs and
+    persistent cache keys are the same on every installation.
+    
+    Args:
+        content: Text to hash
+        
+    Returns:
+        Hex digest of the UTF-8 encoded content
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    
+    # Encode large content a slice at a time so it is never copied in full;
+    # UTF-8 encodes each character independently, so the digest is unchanged
+    for start in range(0, len(content), _HASH_SLICE_CHARS):
+        hasher.update(content[start:start + _HASH_SLICE_CHARS].encode())
+    
+    return hasher.hexdigest()
+
+@functools.lru_cache(maxsize=4096)
+def _document_id(content: str) -> str:
+    """Content hash used as a document ID, memoized for duplicate content during bulk loads."""
+    return content_hash(content)
+
+# Slotted dataclasses: no per-instance __dict__, which matters with many chunks in memory
+@dataclass(slots=True)
 class DocumentChunk:
-    """Represents a chunk of a document with its metadata."""
+    """
+    Represents a chunk of a document with its metadata.
+    
+    The metadata is a read-only view of the dict it was created with; chunks of
+    a document share one view of the document's metadata instead of copies.
+    """
     content: str
-    metadata: Dict[str, Any]
+    metadata: Mapping[str, Any]
     chunk_id: str = ""
     source_file: str = ""
     chunk_index: int = 0
+    
+    def __post_init__(self):
+        """Wrap the metadata in a read-only view unless it already is one."""
+        if not isinstance(self.metadata, MappingProxyType):
+            self.metadata = MappingProxyType(self.metadata)
+    
+    def __reduce__(self):
+        """Pickle the metadata as a dict, since read-only views cannot be pickled."""
+        return (DocumentChunk, (self.content, dict(self.metadata), self.chunk_id, self.source_file, self.chunk_index))
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class Document:
-    """Class representing a document or chunk of text with metadata."""
+    """
+    Class representing a document or chunk of text with metadata.
+    
+    Documents compare and hash by id, so equality is a string compare rather than
+    a field-by-field one, and documents can be deduplicated in sets and dicts.
+    """
     content: str
     metadata: Dict[str, Any] = field(default_factory=dict)
     source_file: str = ""
@@ -40,28 +112,255 @@ class Document:
         """Generate an ID for the document if not provided."""
         if self.id is None:
             # Create a hash of the content as the ID
-            self.id = hashlib.md5(self.content.encode()).hexdigest()
+            self.id = _document_id(self.content)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the document to a dictionary."""
-        return asdict(self)
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Document):
+            return NotImplemented
+        return self.id == other.id
+    
+    def __hash__(self) -> int:
+        return hash(self.id)
+    
+    def to_dict(self, include_chunks: bool = True, include_embedding: bool = True) -> Dict[str, Any]:
+        """
+        Convert the document to a dictionary.
+        
+        Containers are copied one level deep; strings and the embedding are
+        shared with the document rather than deep-copied.
+        
+        Args:
+            include_chunks: Whether to include the serialized chunks
+            include_embedding: Whether to include the embedding
+        
+        Returns:
+            Dictionary representation of the document
+        """
+        data = {
+            "content": self.content,
+            "metadata": dict(self.metadata),
+            "source_file": self.source_file,
+            "doc_id": self.doc_id,
+            "id": self.id,
+        }
+        if include_embedding:
+            data["embedding"] = self.embedding
+        if include_chunks:
+            data["chunks"] = [
+                {
+                    "content": chunk.content,
+                    "metadata": dict(chunk.metadata),
+                    "chunk_id": chunk.chunk_id,
+                    "source_file": chunk.source_file,
+                    "chunk_index": chunk.chunk_index,
+                }
+                for chunk in self.chunks
+            ]
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Document':
         """Create a Document from a dictionary."""
+        data = dict(data)
+        if "chunks" in data:
+            data["chunks"] = [
+                chunk if isinstance(chunk, DocumentChunk) else DocumentChunk(**chunk)
+                for chunk in data["chunks"]
+            ]
         return cls(**data)
 
+# "## Metadata" section of a markdown document, up to the next heading of level 2 or lower.
+# The section is consumed a line at a time, so the heading check runs once per line, not per character
+_METADATA_BLOCK_RE = re.compile(r'^[ \t]*## Metadata[ \t]*$((?:\n(?![ \t]*##).*)*)', re.M)
+# "- key: value" lines within the metadata section
+_METADATA_ITEM_RE = re.compile(r'^[ \t]*-+[ \t]*([^:\n]+):(.*)$', re.M)
+# First level-1 heading of a markdown document
+_TITLE_RE = re.compile(r'^# (.*)$', re.M)
+
+# Files at least this large are memory-mapped instead of read into a bytes copy
+_MMAP_MIN_BYTES = 64 * 1024
+
+@contextmanager
+def _read_bytes(file_path: Path) -> Iterator[Union[bytes, mmap.mmap]]:
+    """
+    Provide the raw contents of a file, memory-mapping large files.
+    
+    Args:
+        file_path: Path to the file
+        
+    Yields:
+        The file contents as bytes, or as a read-only mmap for large files
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_MIN_BYTES:
+            yield f.read()
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+def _read_text(file_path: Path) -> str:
+    """
+    Read a UTF-8 text file, decoding straight from the raw buffer.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        The file contents with universal newlines, as open() in text mode returns them
+    """
+    with _read_bytes(file_path) as data:
+        content = str(data, 'utf-8')
+    
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+# Common top-level metadata fields of JSON and YAML knowledge base documents
+_METADATA_FIELDS = (
+    'title', 'date_created', 'last_updated',
+    'category', 'tags', 'source', 'content_type',
+    'relevance_score'
+)
+_METADATA_FIELD_SET = frozenset(_METADATA_FIELDS)
+
+# Sentinel for an absent key, distinct from an explicit null
+_MISSING = object()
+
+def _extract_metadata(data: Any) -> Dict[str, Any]:
+    """
+    Pick the known metadata fields out of a parsed JSON or YAML document.
+    
+    Args:
+        data: Parsed document
+        
+    Returns:
+        The metadata fields present at the top level of the document
+    """
+    if not isinstance(data, dict):
+        return {}
+    return {field: data[field] for field in _METADATA_FIELDS if field in data}
+
+# Deepest heading level YAML mappings are expanded into; deeper values are rendered as text
+_YAML_MAX_HEADING_LEVEL = 3
+
+def _yaml_to_text(data: Dict[str, Any], skipped_keys: frozenset) -> str:
+    """
+    Render parsed YAML as markdown-style sections.
+    
+    Top-level keys become "##" headings and the keys of mapping values "###"
+    headings; list items become "- item" lines, with mapping items flattened
+    to "- key: value" lines.
+    
+    Args:
+        data: Parsed YAML mapping
+        skipped_keys: Top-level keys to leave out, such as metadata fields
+        
+    Returns:
+        The sections joined by blank lines
+    """
+    parts = []
+    append = parts.append
+    # Explicit depth-first stack of (key, value, heading level), pushed in
+    # reverse so sections come out in document order
+    stack = [(key, value, 2) for key, value in reversed(data.items()) if key not in skipped_keys]
+    
+    while stack:
+        key, value, level = stack.pop()
+        append(f"{'#' * level} {key.capitalize()}")
+        
+        if isinstance(value, dict) and level < _YAML_MAX_HEADING_LEVEL:
+            stack.extend((sub_key, sub_value, level + 1) for sub_key, sub_value in reversed(value.items()))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    for item_key, item_value in item.items():
+                        append(f"- {item_key}: {item_value}")
+                else:
+                    append(f"- {item}")
+        else:
+            append(f"{value}")
+    
+    return "\n\n".join(parts)
+
+# DocumentLoader method that parses each supported file extension
+_LOADER_METHODS = {
+    '.md': '_load_markdown',
+    '.json': '_load_json',
+    '.yaml': '_load_yaml',
+    '.yml': '_load_yaml',
+    '.txt': '_load_text'
+}
+
+# Files that are not loaded when loading a whole directory
+_SKIPPED_FILES = frozenset({'template.md', 'template.json', 'template.yaml', 'template.yml', 'README.md'})
+
+def _iter_supported_files(directory: Union[str, Path], recursive: bool) -> Iterator[str]:
+    """
+    Walk a directory and yield the paths of files DocumentLoader can load.
+    
+    Names are filtered on the directory entries, so no Path objects are built
+    for skipped or unsupported files.
+    
+    Args:
+        directory: Directory to walk
+        recursive: Whether to descend into subdirectories
+        
+    Yields:
+        Paths of supported files
+    """
+    pending = [directory]
+    while pending:
+        subdirectories = []
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                name = entry.name
+                # splitext, like Path.suffix, gives dotfiles such as ".md" no extension
+                if (os.path.splitext(name)[1].lower() in _LOADER_METHODS and name not in _SKIPPED_FILES
+                        and entry.is_file()):
+                    yield entry.path
+                # Symlinked directories are not followed, so a link to a parent cannot loop the walk
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+        # Visit subdirectories in the order they were listed
+        pending.extend(reversed(subdirectories))
+
+# Upper bound on threads used to overlap file reads
+_MAX_LOADER_THREADS = 32
+
+# Executors load_directory can parse files with
+_LOADER_EXECUTORS = ("thread", "process")
+
+def _load_document_safe(loader: "DocumentLoader", file_path: Path) -> Tuple[Optional[Document], Optional[str]]:
+    """
+    Load a document, capturing the error instead of raising it.
+    
+    Module-level so that it can be pickled for worker processes.
+    
+    Args:
+        loader: Loader to load the document with
+        file_path: Path to the document file
+        
+    Returns:
+        Tuple of the loaded document (or None) and the error message (or None)
+    """
+    try:
+        return loader.load_document(file_path), None
+    except Exception as e:
+        return None, str(e)
+
 class DocumentLoader:
     """Loads documents from various file formats."""
     
-    def __init__(self, base_dir: str = "data/knowledge_base"):
+    def __init__(self, base_dir: str = "data/knowledge_base", max_workers: Optional[int] = None):
         """
         Initialize the document loader.
         
         Args:
             base_dir: Base directory for the knowledge base
+            max_workers: Default number of workers used by load_directory (defaults to the CPU count, 1 loads serially)
         """
         self.base_dir = Path(base_dir)
+        self.max_workers = max_workers
     
     def load_document(self, file_path: Union[str, Path]) -> Document:
         """
@@ -80,55 +379,28 @@ class DocumentLoader:
         # Generate a document ID based on the file path
         doc_id = str(file_path.relative_to(self.base_dir))
         
-        if file_path.suffix.lower() == '.md':
-            return self._load_markdown(file_path, doc_id)
-        elif file_path.suffix.lower() == '.json':
-            return self._load_json(file_path, doc_id)
-        elif file_path.suffix.lower() == '.yaml' or file_path.suffix.lower() == '.yml':
-            return self._load_yaml(file_path, doc_id)
-        elif file_path.suffix.lower() == '.txt':
-            return self._load_text(file_path, doc_id)
-        else:
+        # Dispatch on the extension with a single lookup
+        method_name = _LOADER_METHODS.get(file_path.suffix.lower())
+        if method_name is None:
             raise ValueError(f"Unsupported file format: {file_path.suffix}")
+        return getattr(self, method_name)(file_path, doc_id)
     
     def _load_markdown(self, file_path: Path, doc_id: str) -> Document:
         """Parse a markdown file into a Document."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = _read_text(file_path)
             
-        # Extract metadata from markdown
+        # Extract "- key: value" lines from the metadata section
         metadata = {}
-        lines = content.split('\n')
-        
-        # Look for metadata section
-        metadata_section = False
-        metadata_lines = []
-        
-        for i, line in enumerate(lines):
-            if line.strip() == '## Metadata':
-                metadata_section = True
-                continue
-            
-            if metadata_section and line.strip().startswith('##'):
-                metadata_section = False
-                break
-                
-            if metadata_section and line.strip().startswith('-'):
-                metadata_lines.append(line)
-        
-        # Parse metadata lines
-        for line in metadata_lines:
-            parts = line.strip('- ').split(':', 1)
-            if len(parts) == 2:
-                key, value = parts
+        block = _METADATA_BLOCK_RE.search(content)
+        if block:
+            for key, value in _METADATA_ITEM_RE.findall(block.group(1)):
                 metadata[key.strip().lower().replace(' ', '_')] = value.strip()
         
         # If title not in metadata, try to extract from first heading
         if 'title' not in metadata:
-            for line in lines:
-                if line.startswith('# '):
-                    metadata['title'] = line[2:].strip()
-                    break
+            title = _TITLE_RE.search(content)
+            if title:
+                metadata['title'] = title.group(1).strip()
         
         return Document(
             content=content,
@@ -139,44 +411,33 @@ class DocumentLoader:
     
     def _load_json(self, file_path: Path, doc_id: str) -> Document:
         """Parse a JSON file into a Document."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # orjson parses straight from the raw bytes, without a text decoding pass
+        with _read_bytes(file_path) as raw, memoryview(raw) as view:
+            data = orjson.loads(view)
         
         # Extract metadata fields from the JSON
-        metadata = {}
-        content = ""
-        
-        # Common metadata fields
-        metadata_fields = [
-            'title', 'date_created', 'last_updated', 
-            'category', 'tags', 'source', 'content_type',
-            'relevance_score'
-        ]
-        
-        for field in metadata_fields:
-            if field in data:
-                metadata[field] = data[field]
+        metadata = _extract_metadata(data)
         
         # Handle content field (might be nested)
-        if 'content' in data:
-            if isinstance(data['content'], str):
-                content = data['content']
-            elif isinstance(data['content'], dict):
+        body = data.get('content', _MISSING) if isinstance(data, dict) else _MISSING
+        if body is not _MISSING:
+            if isinstance(body, str):
+                content = body
+            elif isinstance(body, dict):
                 content_parts = []
-                if 'summary' in data['content']:
-                    content_parts.append(f"Summary: {data['content']['summary']}")
+                if 'summary' in body:
+                    content_parts.append(f"Summary: {body['summary']}")
                 
-                if 'sections' in data['content']:
-                    for section in data['content']['sections']:
-                        if 'heading' in section:
-                            content_parts.append(f"## {section['heading']}")
-                        if 'text' in section:
-                            content_parts.append(section['text'])
+                for section in body.get('sections', ()):
+                    if 'heading' in section:
+                        content_parts.append(f"## {section['heading']}")
+                    if 'text' in section:
+                        content_parts.append(section['text'])
                 
                 content = "\n\n".join(content_parts)
             else:
                 # Try to convert the content to a string representation
-                content = str(data['content'])
+                content = str(body)
         else:
             # If no content field, use the whole JSON as content
             content = json.dumps(data, indent=2)
@@ -190,54 +451,14 @@ class DocumentLoader:
     
     def _load_yaml(self, file_path: Path, doc_id: str) -> Document:
         """Parse a YAML file into a Document."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        # The loader detects the encoding itself, so skip the text decoding layer
+        with open(file_path, 'rb') as f:
+            data = yaml.load(f, Loader=_YamlLoader)
         
         # Extract metadata fields from the YAML
-        metadata = {}
-        content_parts = []
-        
-        # Common metadata fields at the top level
-        metadata_fields = [
-            'title', 'date_created', 'last_updated', 
-            'category', 'tags', 'source', 'content_type',
-            'relevance_score'
-        ]
-        
-        for field in metadata_fields:
-            if field in data:
-                metadata[field] = data[field]
-        
-        # Convert the YAML content to formatted text
-        for key, value in data.items():
-            if key not in metadata_fields:
-                if isinstance(value, dict):
-                    content_parts.append(f"## {key.capitalize()}")
-                    for sub_key, sub_value in value.items():
-                        if isinstance(sub_value, list):
-                            content_parts.append(f"### {sub_key.capitalize()}")
-                            for item in sub_value:
-                                if isinstance(item, dict):
-                                    for item_key, item_value in item.items():
-                                        content_parts.append(f"- {item_key}: {item_value}")
-                                else:
-                                    content_parts.append(f"- {item}")
-                        else:
-                            content_parts.append(f"### {sub_key.capitalize()}")
-                            content_parts.append(f"{sub_value}")
-                elif isinstance(value, list):
-                    content_parts.append(f"## {key.capitalize()}")
-                    for item in value:
-                        if isinstance(item, dict):
-                            for item_key, item_value in item.items():
-                                content_parts.append(f"- {item_key}: {item_value}")
-                        else:
-                            content_parts.append(f"- {item}")
-                else:
-                    content_parts.append(f"## {key.capitalize()}")
-                    content_parts.append(f"{value}")
+        metadata = _extract_metadata(data)
         
-        content = "\n\n".join(content_parts)
+        content = _yaml_to_text(data, _METADATA_FIELD_SET)
         
         return Document(
             content=content,
@@ -248,8 +469,7 @@ class DocumentLoader:
     
     def _load_text(self, file_path: Path, doc_id: str) -> Document:
         """Parse a text file into a Document."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = _read_text(file_path)
         
         # Extract basic metadata from filename
         filename = file_path.stem
@@ -268,42 +488,88 @@ class DocumentLoader:
             doc_id=doc_id
         )
     
-    def load_directory(self, directory: Union[str, Path], recursive: bool = True) -> List[Document]:
+    def load_directory(
+        self,
+        directory: Union[str, Path],
+        recursive: bool = True,
+        max_workers: Optional[int] = None,
+        max_docs: Optional[int] = None,
+        executor: str = "thread"
+    ) -> List[Document]:
         """
         Load all supported documents from a directory.
         
+        Files are read in a thread pool by default. Pass executor="process" to
+        parse them in worker processes instead; only do so from a script's main
+        module, since with the fork start method the workers inherit any threads
+        the caller holds (chromadb, torch, tokenizers) and with spawn each worker
+        re-imports this module.
+        
         Args:
             directory: Directory to load documents from
             recursive: Whether to recursively load documents from subdirectories
+            max_workers: Number of workers used to load files (defaults to the loader's max_workers, 1 loads serially)
+            max_docs: Stop walking the directory after this many supported files (defaults to no limit)
+            executor: "thread" or "process", the kind of pool files are loaded in
             
         Returns:
             List of Document objects
         """
+        if executor not in _LOADER_EXECUTORS:
+            raise ValueError(f"executor must be one of {_LOADER_EXECUTORS}, got {executor!r}")
+        
         directory = Path(directory)
         if not directory.exists():
             raise FileNotFoundError(f"Directory {directory} not found")
         
         documents = []
         
-        # Get all files in the directory
-        if recursive:
-            files = list(directory.glob('**/*.*'))
+        # Get all supported files in the directory, skipping template files
+        paths = itertools.islice(_iter_supported_files(directory, recursive), max_docs)
+        files = [Path(path) for path in paths]
+        
+        # Load each document, overlapping file reads in threads unless worker processes were requested
+        max_workers = max_workers or self.max_workers or os.cpu_count() or 1
+        if max_workers > 1 and len(files) > 1 and executor == "process":
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(files))) as pool:
+                results = list(pool.map(_load_document_safe, [self] * len(files), files, chunksize=16))
+        elif max_workers > 1 and len(files) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, _MAX_LOADER_THREADS, len(files))) as pool:
+                results = list(pool.map(functools.partial(_load_document_safe, self), files))
         else:
-            files = list(directory.glob('*.*'))
-        
-        # Filter out unsupported file types and template files
-        supported_extensions = ['.md', '.json', '.yaml', '.yml', '.txt']
-        files = [f for f in files if f.suffix.lower() in supported_extensions and f.name != 'template.md' and f.name != 'template.json' and f.name != 'template.yaml' and f.name != 'template.yml' and f.name != 'README.md']
+            results = [_load_document_safe(self, file_path) for file_path in files]
         
-        # Load each document
-        for file_path in files:
-            try:
-                document = self.load_document(file_path)
+        for file_path, (document, error) in zip(files, results):
+            if error is not None:
+                logger.error(f"Error loading document {file_path}: {error}")
+            else:
                 documents.append(document)
-            except Exception as e:
-                logger.error(f"Error loading document {file_path}: {e}")
         
         return documents
+    
+    def has_documents(self, directory: Union[str, Path], recursive: bool = True) -> bool:
+        """
+        Check whether a directory contains any supported document.
+        
+        The walk stops at the first supported file, so nothing is loaded.
+        
+        Args:
+            directory: Directory to check
+            recursive: Whether to look in subdirectories
+            
+        Returns:
+            True if load_directory would find at least one file to load
+        """
+        directory = Path(directory)
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory {directory} not found")
+        
+        return next(_iter_supported_files(directory, recursive), None) is not None
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.get_encoding(encoding_name)
 
 class DocumentChunker:
     """Chunks documents into smaller pieces for processing."""
@@ -312,19 +578,28 @@ class DocumentChunker:
         self, 
         chunk_size: int = 512, 
         chunk_overlap: int = 128,
-        separator: str = "\n"
+        separator: str = "\n",
+        length_unit: str = "characters",
+        encoding_name: str = "cl100k_base"
     ):
         """
         Initialize the document chunker.
         
         Args:
-            chunk_size: Maximum size of each chunk in characters
-            chunk_overlap: Number of characters to overlap between chunks
+            chunk_size: Maximum size of each chunk, in length_unit
+            chunk_overlap: Amount of text to overlap between chunks, in length_unit
             separator: String to use as separator when splitting text
+            length_unit: Unit chunk sizes are measured in, "characters" or "tokens"
+            encoding_name: tiktoken encoding used to count tokens when length_unit is "tokens"
         """
+        if length_unit not in ("characters", "tokens"):
+            raise ValueError(f"Unsupported length unit: {length_unit}")
+        
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.separator = separator
+        self.length_unit = length_unit
+        self._encoding = _get_encoding(encoding_name) if length_unit == "tokens" else None
     
     def chunk_document(self, document: Document) -> Document:
         """
@@ -338,14 +613,13 @@ class DocumentChunker:
         """
         if document.content:
             chunks = self._split_text(document.content, document.source_file)
+            # All chunks share one read-only view of the document's metadata instead of a copy each.
+            # Fields are passed positionally (content, metadata, chunk_id, source_file,
+            # chunk_index), which skips keyword matching for every chunk
+            metadata, source_file = MappingProxyType(document.metadata), document.source_file
+            id_prefix = f"{document.doc_id}_chunk_"
             document.chunks = [
-                DocumentChunk(
-                    content=chunk,
-                    metadata=document.metadata.copy(),
-                    chunk_id=f"{document.doc_id}_chunk_{i}",
-                    source_file=document.source_file,
-                    chunk_index=i
-                )
+                DocumentChunk(chunk, metadata, f"{id_prefix}{i}", source_file, i)
                 for i, chunk in enumerate(chunks)
             ]
         return document
@@ -366,73 +640,113 @@ class DocumentChunker:
         # Split by separator
         sections = text.split(self.separator)
         
-        current_chunk = []
-        current_size = 0
+        # Character offsets of each section in text, so a run of sections is a single slice
+        char_sizes = np.fromiter(map(len, sections), dtype=np.int64, count=len(sections))
+        char_ends = np.cumsum(char_sizes + len(self.separator)) - len(self.separator)
+        char_starts = char_ends - char_sizes
         
-        for section in sections:
-            section_size = len(section)
-            
-            # If a single section is larger than the chunk size, we need to split it
-            if section_size > self.chunk_size:
-                # First add the current chunk if it's not empty
-                if current_chunk:
-                    chunks.append(self.separator.join(current_chunk))
-                    current_chunk = []
-                    current_size = 0
-                
-                # Then split the large section into smaller chunks
-                words = section.split(' ')
-                sub_chunk = []
-                sub_size = 0
-                
-                for word in words:
-                    word_size = len(word) + 1  # +1 for the space
-                    if sub_size + word_size <= self.chunk_size:
-                        sub_chunk.append(word)
-                        sub_size += word_size
-                    else:
-                        chunks.append(' '.join(sub_chunk))
-                        sub_chunk = [word]
-                        sub_size = word_size
-                
-                if sub_chunk:
-                    chunks.append(' '.join(sub_chunk))
+        # Offsets in the unit chunk sizes are measured in
+        if self._encoding is None:
+            token_lists = None
+            sizes, starts, ends = char_sizes, char_starts, char_ends
+        else:
+            token_lists = self._encoding.encode_ordinary_batch(sections, num_threads=os.cpu_count() or 1)
+            separator_size = len(self._encoding.encode_ordinary(self.separator))
+            sizes = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+            ends = np.cumsum(sizes + separator_size) - separator_size
+            starts = ends - sizes
+        
+        # Sections larger than the chunk size are split further and break the packing
+        breaks = np.flatnonzero(sizes > self.chunk_size).tolist() + [len(sections)]
+        
+        first = 0
+        for stop in breaks:
+            for i, j in pack_sections(starts, ends, first, stop, self.chunk_size, self.chunk_overlap):
+                chunks.append(text[char_starts[i]:char_ends[j]])
             
-            # If adding this section would make the chunk too large, start a new chunk
-            elif current_size + section_size + len(self.separator) > self.chunk_size:
-                chunks.append(self.separator.join(current_chunk))
-                
-                # Start new chunk with overlap from the previous chunk
-                if self.chunk_overlap > 0 and current_chunk:
-                    # Calculate overlap characters
-                    overlap_text = self.separator.join(current_chunk)
-                    overlap_start = max(0, len(overlap_text) - self.chunk_overlap)
-                    overlap_text = overlap_text[overlap_start:]
-                    
-                    # Find a clean break at a separator if possible
-                    overlap_sections = overlap_text.split(self.separator)
-                    if len(overlap_sections) > 1:
-                        current_chunk = overlap_sections[1:]
-                        current_size = sum(len(s) for s in current_chunk) + len(self.separator) * (len(current_chunk) - 1)
-                    else:
-                        current_chunk = []
-                        current_size = 0
+            if stop < len(sections):
+                if token_lists is None:
+                    chunks.extend(self._split_section(sections[stop]))
                 else:
-                    current_chunk = []
-                    current_size = 0
-                
-                current_chunk.append(section)
-                current_size += section_size
-            else:
-                current_chunk.append(section)
-                current_size += section_size + len(self.separator)
+                    chunks.extend(self._split_tokens(token_lists[stop]))
+            first = stop + 1
+        
+        return chunks
+    
+    def _split_tokens(self, tokens: List[int]) -> List[str]:
+        """
+        Split a section larger than the chunk size into windows of at most chunk_size tokens.
+        
+        A window never ends inside a multibyte UTF-8 character, which a token
+        can hold only part of, so every chunk decodes without replacement characters.
+        
+        Args:
+            tokens: Tokens of the section
+            
+        Returns:
+            List of text chunks
+        """
+        # A cut before a token is clean unless the token starts with a UTF-8 continuation byte
+        clean = [(token_bytes[0] & 0xC0) != 0x80 for token_bytes in self._encoding.decode_tokens_bytes(tokens)]
+        clean.append(True)
+        
+        windows = []
+        start = 0
+        while start < len(tokens):
+            end = min(start + self.chunk_size, len(tokens))
+            # Move the cut back to a character boundary, or forward if the window has none
+            while end > start + 1 and not clean[end]:
+                end -= 1
+            while not clean[end]:
+                end += 1
+            windows.append(tokens[start:end])
+            start = end
+        return self._encoding.decode_batch(windows)
+    
+    def _split_section(self, section: str) -> List[str]:
+        """
+        Split a section larger than the chunk size on word boundaries.
         
-        # Add the last chunk if there is one
-        if current_chunk:
-            chunks.append(self.separator.join(current_chunk))
+        Args:
+            section: Section to split
+            
+        Returns:
+            List of text chunks
+        """
+        chunks = []
+        words = section.split(' ')
+        
+        # Offset of each word in the section; every word is followed by one space.
+        # Kept as a list since bisect on Python ints is cheaper than a NumPy call per chunk
+        offsets = list(itertools.accumulate((len(word) + 1 for word in words), initial=0))
+        
+        start = 0
+        while start < len(words):
+            # Furthest word boundary that keeps the chunk within the chunk size
+            end = bisect.bisect_right(offsets, offsets[start] + self.chunk_size, start) - 1
+            # A word longer than the chunk size becomes a chunk of its own
+            end = max(end, start + 1)
+            chunks.append(section[offsets[start]:offsets[end] - 1])
+            start = end
         
         return chunks
 
+@functools.lru_cache(maxsize=4096)
+def _path_metadata(source_file: str) -> Tuple[str, str]:
+    """
+    Derive the default content type and title of a document from its path.
+    
+    Memoized since the same files are re-extracted on every re-ingest.
+    
+    Args:
+        source_file: Path of the document file
+        
+    Returns:
+        Tuple of the parent directory name and a title made from the file name
+    """
+    source_path = Path(source_file)
+    return source_path.parent.name, source_path.stem.replace('-', ' ').title()
+
 class MetadataExtractor:
     """Extracts and enhances metadata from documents."""
     
@@ -452,15 +766,13 @@ class MetadataExtractor:
         if 'source_file' not in metadata:
             metadata['source_file'] = document.source_file
         
-        # Extract document type from path if not present
-        if 'content_type' not in metadata:
-            source_path = Path(document.source_file)
-            parent_dir = source_path.parent.name
-            metadata['content_type'] = parent_dir
-        
-        # Generate a title if not present
-        if 'title' not in metadata:
-            source_path = Path(document.source_file)
-            metadata['title'] = source_path.stem.replace('-', ' ').title()
+        if 'content_type' not in metadata or 'title' not in metadata:
+            content_type, title = _path_metadata(document.source_file)
+            
+            # Extract document type from path if not present
+            metadata.setdefault('content_type', content_type)
+            
+            # Generate a title if not present
+            metadata.setdefault('title', title)
         
         return metadata
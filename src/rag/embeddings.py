@@ -1,7 +1,9 @@
 import os
+import sqlite3
+import threading
 import numpy as np
 import logging
-from typing import List, Dict, Any, Union, Optional, TYPE_CHECKING
+from typing import List, Dict, Any, Union, Optional, Literal, TYPE_CHECKING
 from pathlib import Path
 
 # Try to import sentence-transformers, but allow graceful failure
@@ -11,12 +13,85 @@ try:
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
+from .document_processor import content_hash
+
 # For type hints with forward references
 if TYPE_CHECKING:
     from .document_processor import DocumentChunk, Document
 
 logger = logging.getLogger(__name__)
 
+# Pre-exported int8 ONNX graph, dynamically quantized with AVX-512 VNNI kernels
+_ONNX_INT8_FILE_NAME = "onnx/model_qint8_avx512_vnni.onnx"
+
+# Keys per lookup query, below SQLite's default limit on bound parameters
+_CACHE_LOOKUP_BATCH = 500
+
+class EmbeddingCache:
+    """Persistent SQLite store of float32 embeddings keyed by model and content hash."""
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open the cache, creating the database file if needed.
+        
+        Args:
+            path: Path to the SQLite database file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by every thread that embeds, serialized by the lock
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, embedding BLOB NOT NULL, "
+                "PRIMARY KEY (model, key)) WITHOUT ROWID"
+            )
+    
+    def get_many(self, model: str, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings.
+        
+        Args:
+            model: Model namespace the embeddings were generated with
+            keys: Content hashes to look up
+            
+        Returns:
+            Mapping from each cached key to its embedding
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _CACHE_LOOKUP_BATCH):
+                batch = keys[start:start + _CACHE_LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, embedding FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    (model, *batch)
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+    
+    def put_many(self, model: str, keys: List[str], embeddings: np.ndarray):
+        """
+        Store embeddings in a single transaction.
+        
+        Args:
+            model: Model namespace the embeddings were generated with
+            keys: Content hashes, one per embedding row
+            embeddings: float32 matrix with one embedding per row
+        """
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, embedding) VALUES (?, ?, ?)",
+                ((model, key, row.tobytes()) for key, row in zip(keys, embeddings))
+            )
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self.connection.close()
+
 class EmbeddingGenerator:
     """Generates embeddings for document chunks using various embedding models."""
     
@@ -25,7 +100,11 @@ class EmbeddingGenerator:
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         device: str = "cpu",
         normalize_embeddings: bool = True,
-        cache_dir: Optional[str] = None
+        cache_dir: Optional[str] = None,
+        batch_size: int = 128,
+        precision: Literal["fp32", "fp16", "int8"] = "fp32",
+        backend: Literal["torch", "onnx"] = "torch",
+        embedding_cache_path: Optional[str] = None
     ):
         """
         Initialize the embedding generator.
@@ -35,12 +114,28 @@ class EmbeddingGenerator:
             device: Device to use for generating embeddings ("cpu" or "cuda")
             normalize_embeddings: Whether to normalize embeddings
             cache_dir: Directory to cache models
+            batch_size: Number of texts encoded per forward pass
+            precision: Inference precision: "fp16" halves the model on CUDA, "int8" dynamically
+                quantizes its linear layers on CPU
+            backend: Inference backend: "onnx" runs the model with ONNX Runtime, where "int8"
+                loads the model's pre-quantized AVX-512 VNNI graph
+            embedding_cache_path: SQLite file to persist embeddings in, so unchanged texts
+                are not re-encoded on later runs
         """
+        if precision not in ("fp32", "fp16", "int8"):
+            raise ValueError(f"Unsupported precision: {precision}")
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unsupported backend: {backend}")
+        
         self.model_name = model_name
         self.device = device
         self.normalize_embeddings = normalize_embeddings
         self.cache_dir = cache_dir
+        self.batch_size = batch_size
+        self.precision = precision
+        self.backend = backend
         self.model = None
+        self.embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
         
         # Check if sentence-transformers is available
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
@@ -64,9 +159,49 @@ class EmbeddingGenerator:
             kwargs = {"device": self.device}
             if self.cache_dir:
                 kwargs["cache_folder"] = self.cache_dir
+            if self.backend == "onnx":
+                kwargs["backend"] = "onnx"
+                kwargs["model_kwargs"] = self._onnx_model_kwargs()
                 
             # Load the model
             self.model = SentenceTransformer(self.model_name, **kwargs)
+            self._apply_precision()
+    
+    def _onnx_model_kwargs(self) -> Dict[str, Any]:
+        """
+        Build the ONNX Runtime options for the configured device and precision.
+        
+        Returns:
+            Keyword arguments for loading the ONNX model
+        """
+        provider = "CUDAExecutionProvider" if self.device.startswith("cuda") else "CPUExecutionProvider"
+        model_kwargs = {"provider": provider}
+        if self.precision == "int8":
+            # Models without a pre-quantized graph can export one with
+            # sentence_transformers.backend.export_dynamic_quantized_onnx_model
+            model_kwargs["file_name"] = _ONNX_INT8_FILE_NAME
+        return model_kwargs
+    
+    def _apply_precision(self):
+        """Convert the loaded model to the configured inference precision."""
+        if self.backend == "onnx":
+            # ONNX precision is fixed by the graph selected at load time
+            if self.precision == "fp16":
+                logger.warning("fp16 inference is not supported with the ONNX backend; keeping fp32")
+            return
+        
+        if self.precision == "fp16":
+            if self.device.startswith("cuda"):
+                self.model.half()
+            else:
+                logger.warning("fp16 inference is only supported on CUDA; keeping fp32 on %s", self.device)
+        elif self.precision == "int8":
+            if self.device == "cpu":
+                import torch
+                from torch.ao.quantization import quantize_dynamic
+                self.model = quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                logger.warning("int8 dynamic quantization is only supported on CPU; keeping fp32 on %s", self.device)
     
     def generate_embedding(self, text: str) -> np.ndarray:
         """
@@ -76,19 +211,20 @@ class EmbeddingGenerator:
             text: Text to generate embedding for
             
         Returns:
-            Embedding as numpy array
+            Embedding as a float32 numpy array
         """
         self.load_model()
         
         # Generate embedding
         embedding = self.model.encode(
             text, 
-            normalize_embeddings=self.normalize_embeddings
+            normalize_embeddings=self.normalize_embeddings,
+            convert_to_numpy=True
         )
         
-        return embedding
+        return np.asarray(embedding, dtype=np.float32)
     
-    def generate_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts.
         
@@ -96,19 +232,67 @@ class EmbeddingGenerator:
             texts: List of texts to generate embeddings for
             
         Returns:
-            List of embeddings as numpy arrays
+            Contiguous float32 matrix with one embedding per row
+        """
+        # Map each distinct text to its row so duplicated texts (template
+        # boilerplate, shared headings) go through the model only once
+        row_of_text = {}
+        rows = [row_of_text.setdefault(text, len(row_of_text)) for text in texts]
+        if len(row_of_text) < len(texts):
+            return self.generate_embeddings(list(row_of_text))[rows]
+        
+        if self.embedding_cache is None or not texts:
+            return self._encode(texts)
+        
+        # Serve cached texts from disk and only run the model on the misses
+        keys = [content_hash(text) for text in texts]
+        namespace = self._cache_namespace()
+        cached = self.embedding_cache.get_many(namespace, keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        if not missing:
+            return np.stack([cached[key] for key in keys])
+        
+        encoded = self._encode([texts[i] for i in missing])
+        self.embedding_cache.put_many(namespace, [keys[i] for i in missing], encoded)
+        
+        embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        embeddings[missing] = encoded
+        for i, key in enumerate(keys):
+            if key in cached:
+                embeddings[i] = cached[key]
+        return embeddings
+    
+    def _cache_namespace(self) -> str:
+        """Identify the settings that affect embedding values, so cache entries never mix."""
+        normalization = "normalized" if self.normalize_embeddings else "raw"
+        return f"{self.model_name}|{self.backend}|{self.precision}|{normalization}"
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Run the model on a batch of texts.
+        
+        Args:
+            texts: List of texts to encode
+            
+        Returns:
+            Contiguous float32 matrix with one embedding per row
         """
         self.load_model()
         
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        
         # Generate embeddings
         embeddings = self.model.encode(
             texts, 
             normalize_embeddings=self.normalize_embeddings,
-            batch_size=32,  # Adjust batch size as needed
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
             show_progress_bar=len(texts) > 100  # Show progress bar for large batches
         )
         
-        return embeddings
+        # One buffer for the whole batch; callers take rows as views instead of copies
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
     
     def embed_document_chunks(self, chunks: List["DocumentChunk"]) -> List[Dict[str, Any]]:
         """
@@ -118,7 +302,8 @@ class EmbeddingGenerator:
             chunks: List of document chunks to generate embeddings for
             
         Returns:
-            List of dictionaries containing the embedding and metadata for each chunk
+            List of dictionaries containing the embedding and metadata for each chunk.
+            Each embedding is a row view of a single matrix shared by all chunks.
         """
         if not chunks:
             return []
@@ -131,11 +316,12 @@ class EmbeddingGenerator:
         
         # Combine embeddings with metadata
         embedded_chunks = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        for i, chunk in enumerate(chunks):
             embedded_chunks.append({
                 "content": chunk.content,
-                "embedding": embedding,
-                "metadata": chunk.metadata,
+                "embedding": embeddings[i],
+                # Chunks hold a read-only view of their document's metadata; callers get a plain dict
+                "metadata": dict(chunk.metadata),
                 "chunk_id": chunk.chunk_id,
                 "source_file": chunk.source_file,
                 "chunk_index": chunk.chunk_index
@@ -164,7 +350,7 @@ class EmbeddingGenerator:
         
         return {
             "doc_id": document.doc_id,
-            "metadata": document.metadata,
+            "metadata": dict(document.metadata),
             "source_file": document.source_file,
             "chunks": embedded_chunks
         }
@@ -179,10 +365,31 @@ class EmbeddingGenerator:
         Returns:
             List of dictionaries containing document metadata and embedded chunks
         """
-        embedded_documents = []
-        
+        chunker = None
+        chunked_documents = []
         for document in documents:
-            embedded_document = self.embed_document(document)
-            embedded_documents.append(embedded_document)
+            # If document has no chunks, chunk it (but this should normally be done in advance)
+            if not document.chunks:
+                if chunker is None:
+                    from .document_processor import DocumentChunker
+                    chunker = DocumentChunker()
+                document = chunker.chunk_document(document)
+            chunked_documents.append(document)
+        
+        # Embed the chunks of all documents in one batch so the model runs on full batches
+        all_chunks = [chunk for document in chunked_documents for chunk in document.chunks]
+        embedded_chunks = self.embed_document_chunks(all_chunks)
+        
+        # Split the embedded chunks back up by document
+        embedded_documents = []
+        offset = 0
+        for document in chunked_documents:
+            embedded_documents.append({
+                "doc_id": document.doc_id,
+                "metadata": dict(document.metadata),
+                "source_file": document.source_file,
+                "chunks": embedded_chunks[offset:offset + len(document.chunks)]
+            })
+            offset += len(document.chunks)
         
         return embedded_documents
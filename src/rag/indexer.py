@@ -1,7 +1,11 @@
 import os
 import json
 import logging
+import operator
 import numpy as np
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Union, Optional, Tuple
 from pathlib import Path
 
@@ -19,6 +23,71 @@ from .embeddings import EmbeddingGenerator
 
 logger = logging.getLogger(__name__)
 
+# Metadata entries fetched per request when computing collection statistics
+_STATS_PAGE_SIZE = 10_000
+
+# Document IDs per $in filter when deleting, to keep filters small
+_DELETE_BATCH_SIZE = 500
+
+# Comparison operators of Chroma metadata filters
+_FILTER_OPERATORS = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+    "$in": lambda value, options: value in options,
+    "$nin": lambda value, options: value not in options,
+}
+
+def _matches_filter(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Chroma metadata filter against one chunk's metadata.
+    
+    Args:
+        metadata: Chunk metadata
+        where: Chroma where filter, e.g. {"category": "faq"} or {"$and": [...]}
+        
+    Returns:
+        Whether the chunk matches the filter
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            matched = all(_matches_filter(metadata, clause) for clause in condition)
+        elif key == "$or":
+            matched = any(_matches_filter(metadata, clause) for clause in condition)
+        elif key not in metadata:
+            matched = False
+        elif isinstance(condition, dict):
+            matched = all(_FILTER_OPERATORS[op](metadata[key], operand) for op, operand in condition.items())
+        else:
+            matched = metadata[key] == condition
+        if not matched:
+            return False
+    return True
+
+@dataclass
+class _WriteBuffer:
+    """Embedded chunks held back from the collection in buffered mode."""
+    threshold: int
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    # One embedding matrix per buffered call, merged on the first search
+    embeddings: List[np.ndarray] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def matrix(self) -> np.ndarray:
+        """Merge the buffered embedding blocks into one matrix."""
+        if len(self.embeddings) > 1:
+            self.embeddings[:] = [np.vstack(self.embeddings)]
+        return self.embeddings[0]
+
 class VectorStoreIndexer:
     """Manages the vector store and indexing of document embeddings."""
     
@@ -28,7 +97,11 @@ class VectorStoreIndexer:
         collection_name: str = "instagram_chatbot",
         embedding_function_name: str = "sentence_transformer",
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
-        distance_metric: str = "cosine"
+        distance_metric: str = "cosine",
+        num_threads: int = 1,
+        hnsw_M: int = 16,
+        hnsw_construction_ef: int = 200,
+        hnsw_search_ef: int = 100
     ):
         """
         Initialize the vector store indexer.
@@ -39,14 +112,27 @@ class VectorStoreIndexer:
             embedding_function_name: Name of the embedding function to use
             embedding_model: Name of the embedding model to use
             distance_metric: Distance metric to use for similarity search
+            num_threads: Number of add() batches submitted concurrently while indexing,
+                so batch serialization overlaps the native index insertion
+            hnsw_M: Links per node in the HNSW graph; more links raise recall and
+                memory use
+            hnsw_construction_ef: Candidate list size while building the graph; larger
+                values build a better graph more slowly
+            hnsw_search_ef: Candidate list size while querying; larger values raise
+                recall at the cost of query latency
         """
         self.persist_directory = persist_directory
         self.collection_name = collection_name
         self.embedding_function_name = embedding_function_name
         self.embedding_model = embedding_model
         self.distance_metric = distance_metric
+        self.num_threads = num_threads
+        self.hnsw_M = hnsw_M
+        self.hnsw_construction_ef = hnsw_construction_ef
+        self.hnsw_search_ef = hnsw_search_ef
         self.client = None
         self.collection = None
+        self._buffer: Optional[_WriteBuffer] = None
         
         # Check if ChromaDB is available
         if not CHROMADB_AVAILABLE:
@@ -92,20 +178,19 @@ class VectorStoreIndexer:
         
         embedding_function = self._get_embedding_function()
         
-        # Get existing collection or create new one
-        try:
-            self.collection = self.client.get_collection(
-                name=self.collection_name,
-                embedding_function=embedding_function
-            )
-            logger.info(f"Retrieved existing collection: {self.collection_name}")
-        except ValueError:
-            self.collection = self.client.create_collection(
-                name=self.collection_name,
-                embedding_function=embedding_function,
-                metadata={"hnsw:space": self.distance_metric}
-            )
-            logger.info(f"Created new collection: {self.collection_name}")
+        # Get existing collection or create new one; the HNSW settings only
+        # apply when the collection is created
+        self.collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=embedding_function,
+            metadata={
+                "hnsw:space": self.distance_metric,
+                "hnsw:M": self.hnsw_M,
+                "hnsw:construction_ef": self.hnsw_construction_ef,
+                "hnsw:search_ef": self.hnsw_search_ef
+            }
+        )
+        logger.info(f"Using collection: {self.collection_name}")
     
     def index_document(
         self, 
@@ -121,94 +206,249 @@ class VectorStoreIndexer:
             embedding_generator: Optional embedding generator to use
             batch_size: Batch size for indexing chunks
         """
-        # Ensure the collection is initialized
-        if self.collection is None:
-            self._get_collection()
-        
-        # If document has no chunks, chunk it
-        if not document.chunks:
-            from .document_processor import DocumentChunker
-            chunker = DocumentChunker()
-            document = chunker.chunk_document(document)
-        
-        # If embedding generator is provided, use it to generate embeddings
-        if embedding_generator:
-            embedded_document = embedding_generator.embed_document(document)
-            
-            # Index chunks in batches
-            chunks = embedded_document["chunks"]
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i+batch_size]
-                
-                # Extract data for batch
-                ids = [chunk["chunk_id"] for chunk in batch]
-                documents = [chunk["content"] for chunk in batch]
-                embeddings = [chunk["embedding"].tolist() for chunk in batch]
-                metadatas = [
-                    {
-                        **chunk["metadata"],
-                        "chunk_index": chunk["chunk_index"],
-                        "source_file": chunk["source_file"],
-                        "doc_id": document.doc_id
-                    }
-                    for chunk in batch
-                ]
-                
-                # Add to collection
-                self.collection.add(
-                    ids=ids,
-                    documents=documents,
-                    embeddings=embeddings,
-                    metadatas=metadatas
-                )
-        else:
-            # If no embedding generator, let ChromaDB generate embeddings
-            # This requires setting up an embedding function in the collection
-            
-            # Index chunks in batches
-            chunks = document.chunks
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i+batch_size]
-                
-                # Extract data for batch
-                ids = [chunk.chunk_id for chunk in batch]
-                documents = [chunk.content for chunk in batch]
-                metadatas = [
-                    {
-                        **chunk.metadata,
-                        "chunk_index": chunk.chunk_index,
-                        "source_file": chunk.source_file,
-                        "doc_id": document.doc_id
-                    }
-                    for chunk in batch
-                ]
-                
-                # Add to collection
-                self.collection.add(
-                    ids=ids,
-                    documents=documents,
-                    metadatas=metadatas
-                )
+        self.index_documents(
+            documents=[document],
+            embedding_generator=embedding_generator,
+            batch_size=batch_size
+        )
     
     def index_documents(
         self, 
         documents: List[Document],
         embedding_generator: Optional[EmbeddingGenerator] = None,
-        batch_size: int = 100
+        batch_size: int = 1000
     ):
         """
         Index multiple documents in the vector store.
         
+        The chunks of all documents are embedded in one call, then added in
+        batches that span document boundaries, so many small documents still
+        reach the collection in a few large add() calls. With num_threads > 1
+        the batches are submitted concurrently, in no particular order.
+        
         Args:
             documents: List of documents to index
-            embedding_generator: Optional embedding generator to use
-            batch_size: Batch size for indexing chunks
+            embedding_generator: Optional embedding generator to use. Without one,
+                the collection's embedding function embeds the chunks.
+            batch_size: Maximum number of chunks per add() call
         """
+        # Ensure the collection is initialized
+        if self.collection is None:
+            self._get_collection()
+        collection = self.collection
+        
+        # Flatten the chunks of all documents into parallel lists
+        chunker = None
+        ids, contents, metadatas = [], [], []
         for document in documents:
-            self.index_document(
-                document=document,
-                embedding_generator=embedding_generator,
-                batch_size=batch_size
+            # If document has no chunks, chunk it
+            if not document.chunks:
+                if chunker is None:
+                    from .document_processor import DocumentChunker
+                    chunker = DocumentChunker()
+                document = chunker.chunk_document(document)
+            
+            # One pass over the chunks fills all three lists. Chunks normally
+            # share their document's metadata dict, so the document-level part
+            # is built once and only copied per chunk
+            shared_metadata = base_metadata = None
+            for chunk in document.chunks:
+                ids.append(chunk.chunk_id)
+                contents.append(chunk.content)
+                if chunk.metadata is not shared_metadata:
+                    shared_metadata = chunk.metadata
+                    base_metadata = dict(shared_metadata)
+                    base_metadata["doc_id"] = document.doc_id
+                metadata = base_metadata.copy()
+                metadata["chunk_index"] = chunk.chunk_index
+                metadata["source_file"] = chunk.source_file
+                metadatas.append(metadata)
+        
+        # One embedding matrix for the whole corpus keeps the model on full batches
+        embeddings = embedding_generator.generate_embeddings(contents) if embedding_generator and ids else None
+        
+        # Hold embedded chunks back in buffered mode; chunks the collection has
+        # to embed itself could not be searched from the buffer, so add them now
+        if self._buffer is not None and embeddings is not None:
+            self._buffer.ids.extend(ids)
+            self._buffer.documents.extend(contents)
+            self._buffer.metadatas.extend(metadatas)
+            self._buffer.embeddings.append(embeddings)
+            if len(self._buffer) >= self._buffer.threshold:
+                self.flush(batch_size=batch_size)
+            return
+        
+        self._add_chunks(collection, ids, contents, metadatas, embeddings, batch_size)
+    
+    def _add_chunks(
+        self,
+        collection,
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray],
+        batch_size: int
+    ):
+        """
+        Add chunks to the collection in batches of at most batch_size.
+        
+        Args:
+            collection: Collection to add the chunks to
+            ids: Chunk IDs
+            contents: Chunk contents
+            metadatas: Chunk metadata
+            embeddings: float32 matrix of chunk embeddings, or None to let the collection embed them
+            batch_size: Maximum number of chunks per add() call
+        """
+        def add_batch(start: int):
+            end = start + batch_size
+            self._add_batch(
+                collection,
+                ids[start:end],
+                contents[start:end],
+                metadatas[start:end],
+                # Rows go to the collection as the float32 matrix slice, without
+                # materializing a Python float per dimension
+                embeddings[start:end] if embeddings is not None else None
+            )
+        
+        starts = range(0, len(ids), batch_size)
+        if self.num_threads > 1 and len(starts) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.num_threads, len(starts))) as executor:
+                # Consume the results so an error in any batch is raised here
+                list(executor.map(add_batch, starts))
+        else:
+            for start in starts:
+                add_batch(start)
+    
+    def enable_buffered_mode(self, threshold: int = 10_000):
+        """
+        Buffer embedded chunks in memory instead of adding them on every call.
+        
+        Buffered chunks are added to the collection in one go once the buffer
+        holds threshold chunks or flush() is called. Until then they are found
+        by a linear scan in search_buffer(), which Retriever merges with the
+        collection results. A Retriever without an embedding generator cannot
+        scan the buffer, so it flushes it before querying.
+        
+        Args:
+            threshold: Number of buffered chunks that triggers a flush
+        """
+        if self._buffer is None:
+            self._buffer = _WriteBuffer(threshold=threshold)
+        else:
+            self._buffer.threshold = threshold
+    
+    def flush(self, batch_size: int = 1000):
+        """
+        Add all buffered chunks to the collection.
+        
+        Args:
+            batch_size: Maximum number of chunks per add() call
+        """
+        if not self._buffer:
+            return
+        
+        if self.collection is None:
+            self._get_collection()
+        
+        buffer = self._buffer
+        self._add_chunks(self.collection, buffer.ids, buffer.documents, buffer.metadatas, buffer.matrix(), batch_size)
+        self._buffer = _WriteBuffer(threshold=buffer.threshold)
+    
+    def search_buffer(
+        self,
+        query_embedding: np.ndarray,
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, List[List[Any]]]]:
+        """
+        Find the buffered chunks closest to a query embedding.
+        
+        Args:
+            query_embedding: Embedding of the query
+            n_results: Maximum number of chunks to return
+            where: Chroma metadata filter the chunks must match
+            
+        Returns:
+            Results shaped like a collection query result, or None when nothing is buffered
+        """
+        if not self._buffer:
+            return None
+        buffer = self._buffer
+        
+        rows = np.arange(len(buffer))
+        if where:
+            rows = np.flatnonzero([_matches_filter(metadata, where) for metadata in buffer.metadatas])
+        
+        # Distances as the collection defines them for its metric
+        matrix = buffer.matrix()[rows]
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if self.distance_metric == "l2":
+            distances = np.sum((matrix - query) ** 2, axis=1)
+        elif self.distance_metric == "ip":
+            distances = 1.0 - matrix @ query
+        else:
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            distances = 1.0 - (matrix @ query) / np.maximum(norms, np.finfo(np.float32).tiny)
+        
+        nearest = np.argsort(distances, kind="stable")[:n_results].tolist()
+        return {
+            "ids": [[buffer.ids[rows[i]] for i in nearest]],
+            "distances": [[float(distances[i]) for i in nearest]],
+            "metadatas": [[buffer.metadatas[rows[i]] for i in nearest]],
+            "documents": [[buffer.documents[rows[i]] for i in nearest]]
+        }
+    
+    def _discard_buffered(self, doc_ids: List[str]):
+        """Drop buffered chunks of the given documents."""
+        if not self._buffer:
+            return
+        
+        doc_ids = set(doc_ids)
+        buffer = self._buffer
+        keep = [i for i, metadata in enumerate(buffer.metadatas) if metadata["doc_id"] not in doc_ids]
+        if len(keep) == len(buffer):
+            return
+        
+        self._buffer = _WriteBuffer(
+            threshold=buffer.threshold,
+            ids=[buffer.ids[i] for i in keep],
+            documents=[buffer.documents[i] for i in keep],
+            metadatas=[buffer.metadatas[i] for i in keep],
+            embeddings=[buffer.matrix()[keep]] if keep else []
+        )
+    
+    def _add_batch(
+        self,
+        collection,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray]
+    ):
+        """
+        Add one batch of chunks to the collection.
+        
+        Args:
+            collection: Collection to add the chunks to
+            ids: Chunk IDs
+            documents: Chunk contents
+            metadatas: Chunk metadata
+            embeddings: float32 matrix of chunk embeddings, or None to let the collection embed them
+        """
+        if embeddings is not None:
+            collection.add(
+                ids=ids,
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=metadatas
+            )
+        else:
+            collection.add(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas
             )
     
     def delete_document(self, doc_id: str):
@@ -223,6 +463,7 @@ class VectorStoreIndexer:
             self._get_collection()
         
         # Delete all chunks for the document
+        self._discard_buffered([doc_id])
         self.collection.delete(
             where={"doc_id": doc_id}
         )
@@ -231,11 +472,22 @@ class VectorStoreIndexer:
         """
         Delete multiple documents from the vector store.
         
+        Each delete() call removes a whole group of documents with an $in filter,
+        so a failure part-way leaves earlier groups deleted and later ones intact.
+        
         Args:
             doc_ids: List of document IDs to delete
         """
-        for doc_id in doc_ids:
-            self.delete_document(doc_id)
+        # Ensure the collection is initialized
+        if self.collection is None:
+            self._get_collection()
+        
+        doc_ids = list(doc_ids)
+        self._discard_buffered(doc_ids)
+        for start in range(0, len(doc_ids), _DELETE_BATCH_SIZE):
+            self.collection.delete(
+                where={"doc_id": {"$in": doc_ids[start:start + _DELETE_BATCH_SIZE]}}
+            )
     
     def delete_collection(self):
         """Delete the entire collection."""
@@ -244,6 +496,8 @@ class VectorStoreIndexer:
         
         self.client.delete_collection(self.collection_name)
         self.collection = None
+        if self._buffer is not None:
+            self._buffer = _WriteBuffer(threshold=self._buffer.threshold)
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """
@@ -258,32 +512,26 @@ class VectorStoreIndexer:
         # Get count of items in collection
         count = self.collection.count()
         
-        # Get unique document IDs
-        results = self.collection.get(
-            include=["metadatas"],
-            limit=count
-        )
-        
-        metadatas = results["metadatas"]
         doc_ids = set()
-        content_types = {}
-        categories = {}
+        content_types = Counter()
+        categories = Counter()
         
-        for metadata in metadatas:
-            if "doc_id" in metadata:
-                doc_ids.add(metadata["doc_id"])
-            
-            if "content_type" in metadata:
-                content_type = metadata["content_type"]
-                content_types[content_type] = content_types.get(content_type, 0) + 1
+        # Page through the metadata so large collections never load in one piece
+        for offset in range(0, count, _STATS_PAGE_SIZE):
+            results = self.collection.get(
+                include=["metadatas"],
+                limit=_STATS_PAGE_SIZE,
+                offset=offset
+            )
+            metadatas = results["metadatas"]
             
-            if "category" in metadata:
-                category = metadata["category"]
-                categories[category] = categories.get(category, 0) + 1
+            doc_ids.update(metadata["doc_id"] for metadata in metadatas if "doc_id" in metadata)
+            content_types.update(metadata["content_type"] for metadata in metadatas if "content_type" in metadata)
+            categories.update(metadata["category"] for metadata in metadatas if "category" in metadata)
         
         return {
             "total_chunks": count,
             "total_documents": len(doc_ids),
-            "content_types": content_types,
-            "categories": categories
+            "content_types": dict(content_types),
+            "categories": dict(categories)
         }
@@ -1,5 +1,10 @@
 import os
 import logging
+import heapq
+import operator
+import functools
+import itertools
+import tiktoken
 import numpy as np
 from typing import List, Dict, Any, Union, Optional, Tuple
 from pathlib import Path
@@ -11,6 +16,43 @@ from .indexer import VectorStoreIndexer
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
+def _default_encoding() -> Optional["tiktoken.Encoding"]:
+    """
+    Load the tokenizer used to count context tokens.
+    
+    Returns:
+        The cl100k_base encoding, or None when it cannot be loaded (e.g. offline
+        without a cached copy), in which case tokens are estimated from words
+    """
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Could not load the cl100k_base tokenizer, estimating tokens from words: {e}")
+        return None
+
+def _merge_results(
+    results: Dict[str, Any],
+    other: Dict[str, Any],
+    n_results: int
+) -> Dict[str, List[List[Any]]]:
+    """
+    Merge two query results, each sorted by distance, into the n_results closest.
+    
+    Args:
+        results: Collection query result
+        other: Second query result in the same shape
+        n_results: Maximum number of results to keep
+        
+    Returns:
+        Merged result in the collection query result shape
+    """
+    keys = [key for key in ("ids", "distances", "metadatas", "documents") if results.get(key) is not None]
+    rows = (zip(*(result[key][0] for key in keys)) for result in (results, other))
+    distance_index = keys.index("distances")
+    merged = list(itertools.islice(heapq.merge(*rows, key=operator.itemgetter(distance_index)), n_results))
+    return {key: [[row[i] for row in merged]] for i, key in enumerate(keys)}
+
 class QueryTransformer:
     """Transforms user queries for optimal retrieval."""
     
@@ -40,7 +82,8 @@ class Retriever:
         indexer: Optional[VectorStoreIndexer] = None,
         embedding_generator: Optional[EmbeddingGenerator] = None,
         max_results: int = 5,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        query_cache_size: int = 1024
     ):
         """
         Initialize the retriever.
@@ -50,12 +93,36 @@ class Retriever:
             embedding_generator: Embedding generator to use for query embedding
             max_results: Maximum number of results to return
             similarity_threshold: Minimum similarity score for results
+            query_cache_size: Number of query embeddings to keep, so repeated
+                queries skip the embedding model; 0 disables the cache
         """
         self.indexer = indexer
         self.embedding_generator = embedding_generator
         self.max_results = max_results
         self.similarity_threshold = similarity_threshold
         self.query_transformer = QueryTransformer()
+        self._embed_query = functools.lru_cache(maxsize=query_cache_size)(self._generate_query_embedding)
+    
+    def _generate_query_embedding(self, query: str):
+        """Embed a query with the embedding generator; cached by _embed_query."""
+        embedding = self.embedding_generator.generate_embedding(query)
+        if isinstance(embedding, np.ndarray):
+            # The cached array is shared by every retrieval of the same query
+            embedding.setflags(write=False)
+        return embedding
+    
+    def cache_info(self) -> functools._CacheInfo:
+        """
+        Get the query embedding cache statistics.
+        
+        Returns:
+            Hits, misses, maximum size and current size of the cache
+        """
+        return self._embed_query.cache_info()
+    
+    def clear_cache(self):
+        """Drop cached query embeddings, e.g. after changing the embedding generator."""
+        self._embed_query.cache_clear()
     
     def retrieve(
         self, 
@@ -77,6 +144,12 @@ class Retriever:
             
         Returns:
             List of relevant document chunks with similarity scores
+        
+        Note:
+            Buffered chunks (see VectorStoreIndexer.enable_buffered_mode) are
+            merged in by a linear scan when there is an embedding generator.
+            Without one the query is embedded by ChromaDB, so the buffer is
+            flushed into the collection first.
         """
         if self.indexer is None:
             self.indexer = VectorStoreIndexer()
@@ -85,8 +158,8 @@ class Retriever:
         # Transform the query for better retrieval
         transformed_query = self.query_transformer.transform_query(query)
         
-        # Set up includes for the query
-        includes = []
+        # Set up includes for the query; distances are needed for the threshold
+        includes = ["distances"]
         if include_metadata:
             includes.append("metadatas")
         if include_documents:
@@ -95,13 +168,11 @@ class Retriever:
         # Generate query embedding if embedding generator is available
         query_embedding = None
         if self.embedding_generator:
-            query_embedding = self.embedding_generator.generate_embedding(transformed_query)
-            # Convert to list for ChromaDB if it's a numpy array
-            if hasattr(query_embedding, 'tolist'):
-                query_embedding = query_embedding.tolist()
+            # ChromaDB takes the float32 array as is, without boxing each dimension
+            query_embedding = self._embed_query(transformed_query)
         
         # Perform the query
-        if query_embedding:
+        if query_embedding is not None:
             results = self.indexer.collection.query(
                 query_embeddings=[query_embedding],
                 n_results=self.max_results,
@@ -109,7 +180,9 @@ class Retriever:
                 include=includes
             )
         else:
-            # If no embedding generator, let ChromaDB generate the embedding
+            # If no embedding generator, let ChromaDB generate the embedding;
+            # buffered chunks can only be searched once they are in the collection
+            self.indexer.flush()
             results = self.indexer.collection.query(
                 query_texts=[transformed_query],
                 n_results=self.max_results,
@@ -117,27 +190,33 @@ class Retriever:
                 include=includes
             )
         
+        # Chunks still in the indexer's write buffer are not in the collection yet
+        if query_embedding is not None:
+            buffered = self.indexer.search_buffer(query_embedding, self.max_results, filter_criteria)
+            if buffered is not None:
+                results = _merge_results(results, buffered, self.max_results)
+        
+        # Extract results for the single query
+        ids = results["ids"][0]
+        distances = results["distances"][0]
+        metadatas = results["metadatas"][0] if include_metadata else None
+        documents = results["documents"][0] if include_documents else None
+        
+        # Convert distances to similarity scores (assuming cosine distance) and
+        # filter by similarity threshold in one vectorized pass
+        similarity_scores = 1.0 - np.asarray(distances, dtype=np.float64)
+        keep = np.flatnonzero(similarity_scores >= self.similarity_threshold).tolist()
+        
         # Format the results
-        formatted_results = []
-        
-        # Extract results
-        ids = results.get("ids", [[]])[0]
-        distances = results.get("distances", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0] if include_metadata else [{}] * len(ids)
-        documents = results.get("documents", [[]])[0] if include_documents else [""] * len(ids)
-        
-        # Convert distances to similarity scores (assuming cosine distance)
-        similarity_scores = [1 - distance for distance in distances]
-        
-        # Filter by similarity threshold
-        for i, (doc_id, score, metadata, document) in enumerate(zip(ids, similarity_scores, metadatas, documents)):
-            if score >= self.similarity_threshold:
-                formatted_results.append({
-                    "chunk_id": doc_id,
-                    "similarity_score": score,
-                    "metadata": metadata,
-                    "content": document
-                })
+        formatted_results = [
+            {
+                "chunk_id": ids[i],
+                "similarity_score": float(similarity_scores[i]),
+                "metadata": metadatas[i] if metadatas is not None else {},
+                "content": documents[i] if documents is not None else ""
+            }
+            for i in keep
+        ]
         
         # If reranking is enabled, rerank the results
         if rerank and formatted_results:
@@ -161,7 +240,8 @@ class Retriever:
             query: The query to search for
             filter_criteria: Criteria to filter results
             max_tokens: Maximum tokens in the context
-            token_estimator: Function to estimate tokens in a string
+            token_estimator: Function to estimate tokens in a string; defaults to
+                counting cl100k_base tokens
             
         Returns:
             Dictionary with context, sources, and other information
@@ -183,28 +263,27 @@ class Retriever:
                 "chunks_used": 0
             }
         
-        # Simple token estimation if no estimator provided (very rough approximation)
-        if token_estimator is None:
-            token_estimator = lambda text: len(text.split())
+        contents = [chunk["content"] for chunk in retrieved_chunks]
         
-        # Build context by combining chunks until max_tokens is reached
-        context_parts = []
-        sources = []
-        total_tokens = 0
-        chunks_used = 0
+        # Count tokens with the tokenizer by default, falling back to a rough word count
+        if token_estimator is not None:
+            token_counts = [token_estimator(content) for content in contents]
+        else:
+            encoding = _default_encoding()
+            if encoding is not None:
+                token_counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(contents)]
+            else:
+                token_counts = [len(content.split()) for content in contents]
         
-        for chunk in retrieved_chunks:
-            content = chunk["content"]
-            chunk_tokens = token_estimator(content)
-            
-            # If adding this chunk would exceed max_tokens, stop
-            if total_tokens + chunk_tokens > max_tokens:
-                break
-            
-            # Add chunk to context
-            context_parts.append(content)
-            
-            # Add source information
+        # Use the longest prefix of chunks that fits in max_tokens
+        cumulative_tokens = np.cumsum(token_counts)
+        chunks_used = int(np.searchsorted(cumulative_tokens, max_tokens, side="right"))
+        total_tokens = int(cumulative_tokens[chunks_used - 1]) if chunks_used else 0
+        context_parts = contents[:chunks_used]
+        
+        # Add source information
+        sources = []
+        for chunk in retrieved_chunks[:chunks_used]:
             if chunk["metadata"]:
                 source = {
                     "chunk_id": chunk["chunk_id"],
@@ -217,9 +296,6 @@ class Retriever:
                         source[key] = chunk["metadata"][key]
                 
                 sources.append(source)
-            
-            total_tokens += chunk_tokens
-            chunks_used += 1
         
         # Join context parts with newlines
         context = "\n\n".join(context_parts)
@@ -1,7 +1,24 @@
 import os
+import functools
+import threading
 import dspy
 from typing import Dict, Optional
 
+# Serializes the lazy DSPy initialization in get_llm
+_INIT_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _parse_env_file(env_path: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines of a .env file; cached since .env does not change while running"""
+    with open(env_path, 'r') as f:
+        lines = f.read().splitlines()
+    
+    pairs = (
+        line.split('=', 1) for line in map(str.strip, lines)
+        if line and not line.startswith('#') and '=' in line
+    )
+    return {key.strip(): value.strip() for key, value in pairs}
+
 def read_env_file() -> Dict[str, str]:
     """
     Read environment variables directly from .env file
@@ -11,20 +28,12 @@ def read_env_file() -> Dict[str, str]:
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
     env_path = os.path.join(base_dir, '.env')
     
-    env_vars = {}
     try:
-        with open(env_path, 'r') as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip()
+        # Copy so callers cannot modify the cached values
+        return dict(_parse_env_file(env_path))
     except Exception as e:
         print(f"Error reading .env file: {e}")
-    
-    return env_vars
+        return {}
 
 def load_environment() -> Dict[str, str]:
     """Load environment variables from .env file"""
@@ -45,7 +54,7 @@ def init_dspy(verbose: bool = None):
     Initialize DSPy with Anthropic Claude LLM
     
     Args:
-        verbose: Override the DSPY_VERBOSE setting from .env
+        verbose: Override the DSPY_VERBOSE setting from the environment or .env
         
     Returns:
         The configured DSPy LM
@@ -56,13 +65,16 @@ def init_dspy(verbose: bool = None):
     # Get configuration from environment vars
     api_key = env_vars.get("ANTHROPIC_API_KEY")
     model_name = env_vars.get("ANTHROPIC_MODEL")
-    dspy_verbose = verbose if verbose is not None else env_vars.get("DSPY_VERBOSE", "False").lower() == "true"
+    # A DSPY_VERBOSE process environment variable takes precedence over .env
+    verbose_setting = os.environ.get("DSPY_VERBOSE", env_vars.get("DSPY_VERBOSE", "False"))
+    dspy_verbose = verbose if verbose is not None else verbose_setting.lower() == "true"
     
     # Print information about the configuration (masked for security)
-    if api_key:
-        masked_key = api_key[:4] + '*' * (len(api_key) - 8) + api_key[-4:] if len(api_key) > 8 else "***"
-        print(f"Using API key: {masked_key}")
-    print(f"Using model: {model_name}")
+    if dspy_verbose:
+        if api_key:
+            masked_key = api_key[:4] + '*' * (len(api_key) - 8) + api_key[-4:] if len(api_key) > 8 else "***"
+            print(f"Using API key: {masked_key}")
+        print(f"Using model: {model_name}")
     
     # Configure DSPy with model name
     llm = dspy.LM(model_name, api_key=api_key)
@@ -79,9 +91,16 @@ def get_llm():
     Returns:
         The configured LLM
     """
-    if not hasattr(dspy.settings, "lm") or dspy.settings.lm is None:
-        return init_dspy()
-    return dspy.settings.lm
+    lm = getattr(dspy.settings, "lm", None)
+    if lm is not None:
+        return lm
+    
+    # Double-checked so concurrent first calls configure DSPy only once
+    with _INIT_LOCK:
+        lm = getattr(dspy.settings, "lm", None)
+        if lm is None:
+            lm = init_dspy()
+    return lm
 
 if __name__ == "__main__":
     print(os.getenv("ANTHROPIC_API_KEY"))
\ No newline at end of file
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Make the src and tests packages importable once for the whole test session
+ROOT_DIR = str(Path(__file__).resolve().parent.parent)
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
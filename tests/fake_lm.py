@@ -0,0 +1,35 @@
+import itertools
+import dspy
+from dspy.utils import DummyLM
+
+# Canned output fields covering every signature in src.dspy_modules; each
+# predictor only parses the fields its signature declares
+FAKE_OUTPUTS = {
+    "answer": "This is a canned answer.",
+    "intent": "question",
+    "category": "general",
+    "requires_context": "N",
+    "entities": '{"locations": [], "people": [], "dates": [], "topics": [], "keywords": []}',
+}
+
+class FakeLM(DummyLM):
+    """DummyLM that answers every call with the same canned outputs, without network access."""
+
+    def __init__(self, outputs=None):
+        super().__init__([])
+        self.answers = itertools.repeat(outputs or FAKE_OUTPUTS)
+
+def install_fake_lm() -> FakeLM:
+    """
+    Configure DSPy with a FakeLM instead of the LLM from the .env file.
+
+    Returns:
+        The installed FakeLM
+    """
+    lm = FakeLM()
+    dspy.configure(lm=lm)
+    return lm
+
+def uninstall_fake_lm():
+    """Remove the LM installed by install_fake_lm."""
+    dspy.configure(lm=None)
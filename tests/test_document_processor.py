@@ -1,39 +1,39 @@
 import os
-import sys
 import unittest
 import json
 import tempfile
+import hashlib
+import pickle
+import tiktoken
+import numpy as np
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
 
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
 from src.rag.document_processor import (
     Document, 
     DocumentChunk, 
     DocumentLoader, 
     DocumentChunker,
-    MetadataExtractor
+    MetadataExtractor,
+    content_hash
 )
 
 class TestDocumentProcessor(unittest.TestCase):
-    def setUp(self):
-        # Create a temporary directory for test files
-        self.test_dir = Path("test_data")
-        self.test_dir.mkdir(exist_ok=True)
+    @classmethod
+    def setUpClass(cls):
+        # Create the fixture files once in a temporary directory; the tests only read them
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.test_dir = Path(cls.temp_dir.name)
         
         # Create test knowledge base directory structure
-        self.kb_dir = self.test_dir / "knowledge_base"
-        self.kb_dir.mkdir(exist_ok=True)
-        
-        self.faqs_dir = self.kb_dir / "faqs"
-        self.faqs_dir.mkdir(exist_ok=True)
+        cls.kb_dir = cls.test_dir / "knowledge_base"
+        cls.faqs_dir = cls.kb_dir / "faqs"
+        cls.faqs_dir.mkdir(parents=True)
         
         # Create a test markdown file
-        self.test_md_file = self.faqs_dir / "test-faq.md"
-        with open(self.test_md_file, "w") as f:
-            f.write("""# Test FAQ
+        cls.test_md_file = cls.faqs_dir / "test-faq.md"
+        cls.test_md_file.write_text("""# Test FAQ
             
 ## Metadata
 - Date: 2023-06-01
@@ -58,9 +58,8 @@ This is the second paragraph.
 """)
         
         # Create a test JSON file
-        self.test_json_file = self.faqs_dir / "test-json.json"
-        with open(self.test_json_file, "w") as f:
-            f.write("""
+        cls.test_json_file = cls.faqs_dir / "test-json.json"
+        cls.test_json_file.write_text("""
 {
     "title": "Test JSON",
     "date_created": "2023-06-01",
@@ -78,23 +77,10 @@ This is the second paragraph.
 }
 """)
     
-    def tearDown(self):
-        # Remove test files
-        if self.test_md_file.exists():
-            self.test_md_file.unlink()
-        
-        if self.test_json_file.exists():
-            self.test_json_file.unlink()
-        
-        # Remove test directories
-        if self.faqs_dir.exists():
-            self.faqs_dir.rmdir()
-        
-        if self.kb_dir.exists():
-            self.kb_dir.rmdir()
-        
-        if self.test_dir.exists():
-            self.test_dir.rmdir()
+    @classmethod
+    def tearDownClass(cls):
+        # Remove test files and directories
+        cls.temp_dir.cleanup()
     
     def test_document_creation(self):
         """Test that Document objects can be created."""
@@ -240,6 +226,41 @@ class TestDocument(unittest.TestCase):
         doc3 = Document(content="Different content")
         self.assertNotEqual(doc.id, doc3.id)
     
+    def test_documents_compare_and_hash_by_id(self):
+        """Test that documents with the same ID are equal and deduplicate in sets."""
+        doc = Document(content="x", source_file="a.md", embedding=np.zeros(3, dtype=np.float32))
+        duplicate = Document(content="x", source_file="b.md")
+
+        self.assertEqual(doc, duplicate)
+        self.assertEqual(len({doc, duplicate}), 1)
+        self.assertNotEqual(doc, Document(content="x", id="custom"))
+        self.assertNotEqual(doc, "x")
+
+    def test_auto_generated_id_format(self):
+        """Test that generated IDs are 32-character hex digests."""
+        doc = Document(content="This is a test document.")
+        self.assertRegex(doc.id, r"^[0-9a-f]{32}$")
+
+    def test_duplicate_content_is_hashed_once(self):
+        """Test that documents with the same content reuse the memoized ID."""
+        content = "Duplicated content for the ID cache."
+        with patch("src.rag.document_processor.content_hash", wraps=content_hash) as hasher:
+            doc = Document(content=content)
+            doc2 = Document(content=content)
+
+        self.assertEqual(doc.id, doc2.id)
+        self.assertEqual(doc.id, content_hash(content))
+        self.assertLessEqual(hasher.call_count, 1)
+    
+    def test_auto_generated_id_hashes_full_content(self):
+        """Test that IDs of large documents cover the whole content, not a prefix."""
+        prefix = "caf\u00e9 " * 300000
+        doc = Document(content=prefix + "end one")
+        other = Document(content=prefix + "end two")
+        
+        self.assertEqual(doc.id, hashlib.blake2b((prefix + "end one").encode(), digest_size=16).hexdigest())
+        self.assertNotEqual(doc.id, other.id)
+    
     def test_to_dict(self):
         """Test converting a Document to a dictionary."""
         content = "This is a test document."
@@ -276,6 +297,27 @@ class TestDocument(unittest.TestCase):
         self.assertEqual(doc.metadata, doc_dict["metadata"])
         self.assertEqual(doc.id, doc_dict["id"])
         self.assertEqual(doc.embedding, doc_dict["embedding"])
+    
+    def test_documents_and_chunks_use_slots(self):
+        """Test that documents and chunks carry no per-instance __dict__."""
+        doc = Document(content="Slotted.")
+        chunk = DocumentChunk(content="Slotted.", metadata=doc.metadata)
+        
+        self.assertFalse(hasattr(doc, "__dict__"))
+        self.assertFalse(hasattr(chunk, "__dict__"))
+    
+    def test_to_dict_round_trip_and_flags(self):
+        """Test that to_dict round-trips chunks and can omit chunks and embedding."""
+        doc = Document(content="Chunked document.", doc_id="doc", embedding=[0.5])
+        doc.chunks = [DocumentChunk(content="Chunked", metadata=doc.metadata, chunk_id="doc_chunk_0")]
+        
+        restored = Document.from_dict(doc.to_dict())
+        headers = doc.to_dict(include_chunks=False, include_embedding=False)
+        
+        self.assertEqual(restored, doc)
+        self.assertNotIn("chunks", headers)
+        self.assertNotIn("embedding", headers)
+        self.assertEqual(headers["id"], doc.id)
 
 class TestDocumentLoader(unittest.TestCase):
     """Tests for the DocumentLoader class."""
@@ -300,20 +342,12 @@ This is section 1.
 ## Section 2
 This is section 2.
 """
-        self.md_file = self.base_dir / "test.md"
-        with open(self.md_file, 'w', encoding='utf-8') as f:
-            f.write(self.md_content)
-        
         self.json_content = {
             "title": "Test JSON",
             "date_created": "2023-01-01",
             "category": "test",
             "content": "This is JSON content."
         }
-        self.json_file = self.base_dir / "test.json"
-        with open(self.json_file, 'w', encoding='utf-8') as f:
-            json.dump(self.json_content, f)
-        
         self.yaml_content = """
 title: Test YAML
 date_created: 2023-01-01
@@ -324,14 +358,21 @@ sections:
   - heading: Section 2
     content: This is section 2.
 """
-        self.yaml_file = self.base_dir / "test.yaml"
-        with open(self.yaml_file, 'w', encoding='utf-8') as f:
-            f.write(self.yaml_content)
-        
         self.txt_content = "This is a text file content."
+        
+        # Write every fixture as pre-encoded bytes in one pass
+        self.md_file = self.base_dir / "test.md"
+        self.json_file = self.base_dir / "test.json"
+        self.yaml_file = self.base_dir / "test.yaml"
         self.txt_file = self.base_dir / "test.txt"
-        with open(self.txt_file, 'w', encoding='utf-8') as f:
-            f.write(self.txt_content)
+        fixtures = {
+            self.md_file: self.md_content.encode('utf-8'),
+            self.json_file: json.dumps(self.json_content).encode('utf-8'),
+            self.yaml_file: self.yaml_content.encode('utf-8'),
+            self.txt_file: self.txt_content.encode('utf-8')
+        }
+        for path, data in fixtures.items():
+            path.write_bytes(data)
     
     def tearDown(self):
         """Clean up after the test."""
@@ -345,7 +386,18 @@ sections:
         self.assertIn("title", doc.metadata)
         self.assertEqual(doc.metadata["title"], "Test Markdown")
         self.assertEqual(doc.source_file, str(self.md_file))
-    
+
+    def test_markdown_metadata_stops_at_next_heading(self):
+        """Test that only list items inside the metadata section become metadata."""
+        md_file = self.base_dir / "sections.md"
+        with open(md_file, 'w', encoding='utf-8') as f:
+            f.write("# Sections\n\n## Metadata\n- Content Type: FAQ\n\n- Category: test\n"
+                    "  ## Question\n- answer: not metadata\n")
+
+        doc = self.loader.load_document(md_file)
+
+        self.assertEqual(doc.metadata, {"content_type": "FAQ", "category": "test", "title": "Sections"})
+
     def test_load_document_json(self):
         """Test loading a JSON document."""
         doc = self.loader.load_document(self.json_file)
@@ -354,6 +406,18 @@ sections:
         self.assertIn("title", doc.metadata)
         self.assertEqual(doc.metadata["title"], "Test JSON")
         self.assertEqual(doc.source_file, str(self.json_file))
+
+    def test_load_document_yaml(self):
+        """Test loading a YAML document into markdown-style sections."""
+        doc = self.loader.load_document(self.yaml_file)
+        
+        self.assertEqual(
+            doc.content,
+            "## Sections\n\n- heading: Section 1\n\n- content: This is section 1.\n\n"
+            "- heading: Section 2\n\n- content: This is section 2."
+        )
+        self.assertEqual(doc.metadata["title"], "Test YAML")
+        self.assertNotIn("sections", doc.metadata)
     
     def test_load_document_txt(self):
         """Test loading a text document."""
@@ -399,6 +463,90 @@ sections:
         docs = self.loader.load_directory(self.base_dir, recursive=False)
         self.assertEqual(len(docs), 4)
 
+    def test_load_directory_skips_templates_and_unsupported_files(self):
+        """Test that template, README and unsupported files are not loaded."""
+        for name in ["template.md", "README.md", "notes.csv", ".md", ".json"]:
+            with open(self.base_dir / name, 'w', encoding='utf-8') as f:
+                f.write("# Skipped")
+        
+        docs = self.loader.load_directory(self.base_dir)
+        
+        loaded_names = {Path(doc.source_file).name for doc in docs}
+        self.assertEqual(len(docs), 4)
+        self.assertFalse(loaded_names & {"template.md", "README.md", "notes.csv", ".md", ".json"})
+    
+    def test_load_directory_does_not_follow_directory_symlinks(self):
+        """Test that a symlink back to a parent directory does not loop the recursive walk."""
+        nested = self.base_dir / "nested"
+        nested.mkdir()
+        try:
+            os.symlink(self.base_dir, nested / "loop", target_is_directory=True)
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks are not supported here")
+        
+        docs = self.loader.load_directory(self.base_dir, recursive=True)
+        
+        self.assertEqual(len(docs), 4)
+    
+    def test_load_directory_in_worker_processes(self):
+        """Test that loading with worker processes returns the same documents in the same order."""
+        serial_docs = self.loader.load_directory(self.base_dir, max_workers=1)
+        
+        parallel_docs = self.loader.load_directory(self.base_dir, max_workers=2, executor="process")
+        
+        self.assertEqual([doc.source_file for doc in parallel_docs], [doc.source_file for doc in serial_docs])
+        self.assertEqual([doc.content for doc in parallel_docs], [doc.content for doc in serial_docs])
+    
+    def test_load_directory_never_starts_processes_by_default(self):
+        """Test that large directories are still loaded in threads unless processes are requested."""
+        for i in range(40):
+            (self.base_dir / f"extra_{i}.txt").write_text(f"Extra document {i}")
+        
+        with patch("src.rag.document_processor.ProcessPoolExecutor") as process_pool:
+            docs = self.loader.load_directory(self.base_dir, max_workers=2)
+        
+        process_pool.assert_not_called()
+        self.assertEqual(len(docs), 44)
+        with self.assertRaises(ValueError):
+            self.loader.load_directory(self.base_dir, executor="fork")
+
+    def test_load_directory_max_docs_and_has_documents(self):
+        """Test that the directory walk can stop early."""
+        docs = self.loader.load_directory(self.base_dir, max_docs=2)
+        self.assertEqual(len(docs), 2)
+        self.assertEqual(len(self.loader.load_directory(self.base_dir, max_docs=10)), 4)
+
+        self.assertTrue(self.loader.has_documents(self.base_dir))
+
+        empty_dir = self.base_dir / "empty"
+        (empty_dir / "nested").mkdir(parents=True)
+        (empty_dir / "nested" / "notes.csv").write_text("a,b")
+        self.assertFalse(self.loader.has_documents(empty_dir))
+
+    def test_load_directory_in_threads(self):
+        """Test that small directories loaded in threads keep the serial order."""
+        serial_loader = DocumentLoader(base_dir=str(self.base_dir), max_workers=1)
+        threaded_loader = DocumentLoader(base_dir=str(self.base_dir), max_workers=4)
+
+        serial_docs = serial_loader.load_directory(self.base_dir)
+        with patch("src.rag.document_processor.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor:
+            threaded_docs = threaded_loader.load_directory(self.base_dir)
+
+        executor.assert_called_once_with(max_workers=4)
+        self.assertEqual([doc.source_file for doc in threaded_docs], [doc.source_file for doc in serial_docs])
+
+    def test_load_large_text_file(self):
+        """Test that large files are read through a memory map with universal newlines."""
+        large_file = self.base_dir / "large.txt"
+        lines = [f"Line {i} with some padding text" for i in range(5000)]
+        with open(large_file, 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write("\n".join(lines) + " caf\u00e9")
+        
+        doc = self.loader.load_document(large_file)
+        
+        self.assertGreater(large_file.stat().st_size, 64 * 1024)
+        self.assertEqual(doc.content, "\n".join(lines) + " caf\u00e9")
+
 class TestDocumentChunker(unittest.TestCase):
     """Tests for the DocumentChunker class."""
     
@@ -423,13 +571,29 @@ class TestDocumentChunker(unittest.TestCase):
         self.assertIsNotNone(chunked_doc.chunks)
         self.assertGreater(len(chunked_doc.chunks), 0)
         
-        # Test that each chunk has the correct metadata
+        # Test that each chunk has the correct metadata, shared as one read-only view
         for i, chunk in enumerate(chunked_doc.chunks):
+            self.assertIs(chunk.metadata, chunked_doc.chunks[0].metadata)
             self.assertEqual(chunk.metadata["title"], "Test Doc")
             self.assertEqual(chunk.source_file, "test.txt")
             self.assertEqual(chunk.chunk_index, i)
             self.assertEqual(chunk.chunk_id, f"test_doc_chunk_{i}")
     
+    def test_chunk_metadata_is_read_only(self):
+        """Test that chunk metadata cannot be mutated through one chunk into its siblings and document."""
+        doc = Document(content="\n".join(["Line one", "Line two"]), metadata={"title": "Test Doc"}, doc_id="doc")
+        chunked_doc = DocumentChunker(chunk_size=8, chunk_overlap=0).chunk_document(doc)
+        
+        with self.assertRaises(TypeError):
+            chunked_doc.chunks[0].metadata["title"] = "Changed"
+        with self.assertRaises(TypeError):
+            DocumentChunk(content="Loose", metadata={"title": "Loose"}).metadata["title"] = "Changed"
+        self.assertEqual(doc.metadata, {"title": "Test Doc"})
+        self.assertEqual(chunked_doc.chunks[1].metadata, {"title": "Test Doc"})
+        
+        restored = pickle.loads(pickle.dumps(chunked_doc.chunks[0]))
+        self.assertEqual(restored, chunked_doc.chunks[0])
+    
     def test_empty_document(self):
         """Test chunking an empty document."""
         doc = Document(
@@ -454,6 +618,80 @@ class TestDocumentChunker(unittest.TestCase):
         for chunk in chunks:
             self.assertLessEqual(len(chunk), self.chunker.chunk_size)
 
+    def test_split_text_overlap(self):
+        """Test that consecutive chunks share the trailing sections that fit in the overlap."""
+        text = "\n".join([f"Line {i:03d}" for i in range(30)])
+        chunks = self.chunker._split_text(text, "test.txt")
+        
+        self.assertGreater(len(chunks), 1)
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertLessEqual(len(current), self.chunker.chunk_size)
+            self.assertEqual(current.split("\n")[0], previous.split("\n")[-2])
+        self.assertTrue(chunks[-1].endswith("Line 029"))
+    
+    def test_split_text_oversized_section(self):
+        """Test that a section longer than the chunk size is split on words."""
+        long_line = " ".join(["word"] * 60)
+        text = "\n".join(["First line", long_line, "Last line"])
+        chunks = self.chunker._split_text(text, "test.txt")
+        
+        self.assertEqual(chunks[0], "First line")
+        self.assertEqual(chunks[-1], "Last line")
+        self.assertEqual(" ".join(chunks[1:-1]), long_line)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), self.chunker.chunk_size)
+
+    def test_split_section_overlong_word(self):
+        """Test that a word longer than the chunk size becomes its own chunk."""
+        chunker = DocumentChunker(chunk_size=10, chunk_overlap=0)
+        
+        chunks = chunker._split_section("abcdefghijklmno ab cd ef")
+        
+        self.assertEqual(chunks, ["abcdefghijklmno", "ab cd ef"])
+
+    def test_split_text_in_tokens(self):
+        """Test that chunk sizes are measured in tokens when requested."""
+        # Byte-level encoding built offline: one token per byte
+        encoding = tiktoken.Encoding(
+            name="bytes",
+            pat_str=r"\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={}
+        )
+        with patch("src.rag.document_processor._get_encoding", return_value=encoding):
+            chunker = DocumentChunker(chunk_size=20, chunk_overlap=0, length_unit="tokens")
+        
+        text = "\n".join(["short line", "another one", "x" * 45])
+        chunks = chunker._split_text(text, "test.txt")
+        
+        self.assertEqual(chunks, ["short line", "another one", "x" * 20, "x" * 20, "x" * 5])
+        for chunk in chunks:
+            self.assertLessEqual(len(encoding.encode_ordinary(chunk)), 20)
+    
+    def test_split_tokens_keeps_multibyte_characters_whole(self):
+        """Test that token windows are never cut inside a multibyte UTF-8 character."""
+        # Byte-level encoding built offline: one token per byte, so "é" spans two tokens
+        encoding = tiktoken.Encoding(
+            name="bytes",
+            pat_str=r"\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={}
+        )
+        with patch("src.rag.document_processor._get_encoding", return_value=encoding):
+            chunker = DocumentChunker(chunk_size=5, chunk_overlap=0, length_unit="tokens")
+        
+        chunks = chunker._split_tokens(encoding.encode_ordinary("caf\u00e9 \u00e9t\u00e9 \u2603\u2603"))
+        
+        self.assertEqual("".join(chunks), "caf\u00e9 \u00e9t\u00e9 \u2603\u2603")
+        self.assertFalse(any("\ufffd" in chunk for chunk in chunks))
+        for chunk in chunks:
+            self.assertLessEqual(len(encoding.encode_ordinary(chunk)), 5)
+    
+    def test_invalid_length_unit(self):
+        """Test that an unknown length unit is rejected."""
+        with self.assertRaises(ValueError):
+            DocumentChunker(length_unit="words")
+
 class TestMetadataExtractor(unittest.TestCase):
     """Tests for the MetadataExtractor class."""
     
@@ -499,5 +737,25 @@ class TestMetadataExtractor(unittest.TestCase):
         self.assertEqual(metadata["content_type"], "custom_type")
         self.assertEqual(metadata["source_file"], "custom_path")
 
+    def test_repeated_extraction_returns_independent_copies(self):
+        """Test that re-extracting a document reuses the path metadata but not the returned dict."""
+        doc = Document(
+            content="Test content",
+            metadata={"tags": ["a", "b"]},
+            source_file="/path/to/faqs/repeated-file.md",
+            doc_id="test_doc"
+        )
+
+        first = self.extractor.extract_metadata(doc)
+        first["title"] = "Changed"
+
+        with patch("src.rag.document_processor.Path") as path:
+            second = self.extractor.extract_metadata(doc)
+
+        path.assert_not_called()
+        self.assertEqual(second["title"], "Repeated File")
+        self.assertEqual(second["content_type"], "faqs")
+        self.assertNotIn("title", doc.metadata)
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
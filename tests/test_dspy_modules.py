@@ -0,0 +1,448 @@
+import asyncio
+import unittest
+import dspy
+import numpy as np
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from dspy.utils import DummyLM
+
+from src.dspy_modules import (
+    SemanticCache, GeneralKnowledgeQA, ContextQA, MessageEntityExtractor,
+    MessageIntentClassifier, MessageAnalyzer, QAResult
+)
+from src.dspy_modules.cache import LRUCache
+from src.dspy_modules.signatures import MessageAnalyze
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_and_put(self):
+        """Test that stored values are returned for the same key."""
+        cache = LRUCache(maxsize=2)
+        cache.put(("context", "question"), "answer")
+
+        self.assertEqual(cache.get(("context", "question")), "answer")
+        self.assertIsNone(cache.get(("context", "other question")))
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_zero_maxsize_disables_cache(self):
+        """Test that a cache with maxsize 0 never stores anything."""
+        cache = LRUCache(maxsize=0)
+        cache.put("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+
+class TestMessageEntityExtractor(unittest.TestCase):
+    def test_extractor_reuses_parsed_result(self):
+        """Test that MessageEntityExtractor calls the predictor once per distinct message."""
+        extractor = MessageEntityExtractor()
+        mock_prediction = MagicMock()
+        mock_prediction.entities = '{"locations": ["Paris"], "people": [], "dates": [], "topics": [], "keywords": []}'
+
+        with patch.object(extractor, "predictor", return_value=mock_prediction) as mock_predictor:
+            first = extractor(message="I'm going to Paris")
+            second = extractor(message="I'm going to Paris")
+
+        self.assertEqual(mock_predictor.call_count, 1)
+        self.assertEqual(second["locations"], ["Paris"])
+        self.assertIs(second, first)
+
+    def test_extractor_skips_parsing_non_object_output(self):
+        """Test that entity output that is not a JSON object yields empty lists without parsing."""
+        extractor = MessageEntityExtractor()
+        outputs = {"Trip to Paris": "No entities found", "Lunch in Rome": None,
+                   "Dinner in Oslo": '  {"locations": ["Oslo"]}'}
+
+        with patch.object(extractor, "predictor", side_effect=lambda message: MagicMock(entities=outputs[message])), \
+                patch("src.dspy_modules.modules.orjson.loads", wraps=orjson.loads) as loads:
+            results = [extractor(message=message) for message in outputs]
+
+        self.assertEqual(loads.call_count, 1)
+        self.assertEqual([result["locations"] for result in results], [[], [], ["Oslo"]])
+        self.assertEqual(results[0]["keywords"], [])
+
+    def test_extractor_normalizes_entity_lists(self):
+        """Test that entity lists are stripped and deduplicated case-insensitively."""
+        extractor = MessageEntityExtractor()
+        mock_prediction = MagicMock()
+        mock_prediction.entities = '{"locations": [" Paris", "paris", "Rome", ""], "people": "John", "keywords": ["trip", 3]}'
+
+        with patch.object(extractor, "predictor", return_value=mock_prediction):
+            result = extractor(message="Paris or Rome with John?")
+
+        self.assertEqual(result["locations"], ["Paris", "Rome"])
+        self.assertEqual(result["people"], [])
+        self.assertEqual(result["keywords"], ["trip"])
+
+class TestResults(unittest.TestCase):
+    def test_result_supports_dict_style_access(self):
+        """Test that result objects keep the dict-style access of the old dict results."""
+        result = QAResult("Paris", None)
+
+        self.assertEqual(result["answer"], "Paris")
+        self.assertEqual(result.answer, "Paris")
+        self.assertIn("full_result", result)
+        self.assertNotIn("locations", result)
+        self.assertEqual(result.get("locations", []), [])
+        self.assertEqual(result.keys(), ["answer", "full_result"])
+        with self.assertRaises(KeyError):
+            result["locations"]
+
+    def test_result_is_immutable(self):
+        """Test that cached result objects cannot be modified by callers."""
+        result = QAResult("Paris", None)
+
+        with self.assertRaises(AttributeError):
+            result.answer = "Rome"
+
+class TestSmallTalk(unittest.TestCase):
+    def test_greetings_skip_the_llm(self):
+        """Test that bare greetings are classified and extracted without calling the predictor."""
+        classifier = MessageIntentClassifier()
+        extractor = MessageEntityExtractor()
+
+        with patch.object(classifier, "predictor") as mock_classifier_predictor, \
+                patch.object(extractor, "predictor") as mock_extractor_predictor:
+            classification = classifier(message="Hey there!")
+            entities = extractor(message="thanks")
+            blank = extractor(message="   ")
+
+        mock_classifier_predictor.assert_not_called()
+        mock_extractor_predictor.assert_not_called()
+        self.assertEqual(classification["intent"], "greeting")
+        self.assertFalse(classification["requires_context"])
+        self.assertEqual(entities["locations"], [])
+        self.assertEqual(blank["keywords"], [])
+
+    def test_short_messages_with_entities_use_the_llm(self):
+        """Test that short messages that aren't small talk still reach the predictor."""
+        extractor = MessageEntityExtractor()
+        mock_prediction = MagicMock()
+        mock_prediction.entities = '{"locations": ["Paris"]}'
+
+        with patch.object(extractor, "predictor", return_value=mock_prediction) as mock_predictor:
+            result = extractor(message="Visiting Paris")
+
+        mock_predictor.assert_called_once()
+        self.assertEqual(result["locations"], ["Paris"])
+
+class TestPredictors(unittest.TestCase):
+    def test_modules_get_independent_predictors(self):
+        """Test that modules built from the same signature don't share predictor state."""
+        first = GeneralKnowledgeQA()
+        second = GeneralKnowledgeQA()
+
+        first.predictor.demos.append("demo")
+        first.predictor._compiled = True
+
+        self.assertIsNot(first.predictor, second.predictor)
+        self.assertIs(first.predictor.signature, second.predictor.signature)
+        self.assertNotEqual(first.predictor.stage, second.predictor.stage)
+        self.assertEqual(second.predictor.demos, [])
+        self.assertFalse(second.predictor._compiled)
+
+class TestForwardBatch(unittest.TestCase):
+    def test_forward_batch_preserves_order_and_context(self):
+        """Test that forward_batch returns results in input order using the caller's dspy.context LM."""
+        qa_module = GeneralKnowledgeQA()
+        lm = DummyLM({
+            "What is the capital of France?": {"answer": "Paris"},
+            "What is the capital of Spain?": {"answer": "Madrid"},
+        })
+
+        with dspy.context(lm=lm):
+            results = qa_module.forward_batch(
+                ["What is the capital of Spain?", "What is the capital of France?"],
+                num_threads=2
+            )
+
+        self.assertEqual([result["answer"] for result in results], ["Madrid", "Paris"])
+
+    def test_extractor_forward_batch_columnar(self):
+        """Test that columnar forward_batch returns one list per entity type in input order."""
+        extractor = MessageEntityExtractor()
+        lm = DummyLM({
+            "Flying to Paris with Anna": {"entities": '{"locations": ["Paris"], "people": ["Anna"]}'},
+            "Rome next week": {"entities": '{"locations": ["Rome"], "dates": ["next week"]}'},
+        })
+
+        with dspy.context(lm=lm):
+            columns = extractor.forward_batch(["Flying to Paris with Anna", "Rome next week"], columnar=True)
+
+        self.assertEqual(list(columns), ["locations", "people", "dates", "topics", "keywords"])
+        self.assertEqual(columns["locations"], [["Paris"], ["Rome"]])
+        self.assertEqual(columns["people"], [["Anna"], []])
+        self.assertEqual(columns["dates"], [[], ["next week"]])
+
+    def test_context_qa_forward_batch_rejects_mismatched_lengths(self):
+        """Test that ContextQA.forward_batch refuses to drop questions without a context."""
+        with self.assertRaises(ValueError):
+            ContextQA().forward_batch(["France facts"], ["What is the capital of France?", "And of Spain?"])
+
+    def test_forward_batch_bounds_its_thread_pool(self):
+        """Test that a large batch runs on dspy.settings.num_threads workers, not one thread per input."""
+        qa_module = GeneralKnowledgeQA()
+        questions = [f"Question {i}?" for i in range(50)]
+
+        with patch("src.dspy_modules.modules.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as mock_executor:
+            with dspy.context(lm=DummyLM([{"answer": "42"}] * len(questions)), num_threads=4):
+                results = qa_module.forward_batch(questions)
+
+        self.assertEqual(len(results), len(questions))
+        self.assertEqual(mock_executor.call_args.kwargs["max_workers"], 4)
+
+    def test_forward_batch_empty(self):
+        """Test that forward_batch handles an empty batch."""
+        self.assertEqual(GeneralKnowledgeQA().forward_batch([]), [])
+
+    def test_aforward_batch_preserves_order_and_context(self):
+        """Test that aforward_batch classifies from async code in input order with the caller's LM."""
+        classifier = MessageIntentClassifier()
+        extractor = MessageEntityExtractor()
+        lm = DummyLM({
+            "Is the beach in Nice busy?": {"intent": "question", "category": "travel", "requires_context": "Y",
+                                           "entities": '{"locations": ["Nice"]}'},
+            "Your reel made my day": {"intent": "compliment", "category": "personal", "requires_context": "N",
+                                      "entities": '{"topics": ["reel"]}'},
+        })
+        messages = ["Your reel made my day", "Is the beach in Nice busy?"]
+
+        async def run():
+            with dspy.context(lm=lm):
+                return (
+                    await classifier.aforward_batch(messages, num_threads=1),
+                    await extractor.aforward_batch(messages, columnar=True)
+                )
+
+        classifications, columns = asyncio.run(run())
+
+        self.assertEqual([result["intent"] for result in classifications], ["compliment", "question"])
+        self.assertEqual(columns["locations"], [[], ["Nice"]])
+        self.assertEqual(columns["topics"], [["reel"], []])
+
+class TestMessageAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.mock_prediction = MagicMock()
+        self.mock_prediction.intent = "question"
+        self.mock_prediction.category = "travel"
+        self.mock_prediction.requires_context = "Y"
+        self.mock_prediction.entities = '{"locations": ["Paris"], "people": [], "dates": ["tomorrow"], "topics": ["travel"], "keywords": []}'
+
+    def test_analyzer_returns_combined_result(self):
+        """Test that MessageAnalyzer returns classification and entities together."""
+        analyzer = MessageAnalyzer()
+
+        with patch.object(analyzer, "predictor", return_value=self.mock_prediction):
+            result = analyzer(message="Should I fly to Paris tomorrow?")
+
+        self.assertEqual(result["intent"], "question")
+        self.assertTrue(result["requires_context"])
+        self.assertEqual(result["locations"], ["Paris"])
+        self.assertEqual(result["dates"], ["tomorrow"])
+
+    def test_shared_analyzer_makes_one_call(self):
+        """Test that a classifier and extractor sharing an analyzer call the LLM once per message."""
+        analyzer = MessageAnalyzer()
+        classifier = MessageIntentClassifier(analyzer=analyzer)
+        extractor = MessageEntityExtractor(analyzer=analyzer)
+
+        with patch.object(analyzer, "predictor", return_value=self.mock_prediction) as mock_predictor:
+            classification = classifier(message="Should I fly to Paris tomorrow?")
+            entities = extractor(message="Should I fly to Paris tomorrow?")
+
+        self.assertEqual(mock_predictor.call_count, 1)
+        self.assertEqual(classification["category"], "travel")
+        self.assertNotIn("locations", classification)
+        self.assertEqual(entities["locations"], ["Paris"])
+        self.assertNotIn("intent", entities)
+
+class TestClassifierStreaming(unittest.TestCase):
+    def _collect(self, classifier, message):
+        async def collect():
+            return [value async for value in classifier.astream(message)]
+        return asyncio.run(collect())
+
+    def test_astream_yields_requires_context_first(self):
+        """Test that astream emits requires_context before the full classification."""
+        classifier = MessageIntentClassifier()
+        lm = DummyLM([{"requires_context": "Y", "intent": "question", "category": "travel"}])
+
+        with dspy.context(lm=lm):
+            values = self._collect(classifier, "What's the weather in Paris?")
+
+        self.assertEqual(values[0], {"requires_context": True})
+        self.assertEqual(values[-1]["intent"], "question")
+        self.assertTrue(values[-1]["requires_context"])
+
+    def test_astream_uses_cached_result(self):
+        """Test that astream answers repeated messages from the result cache."""
+        classifier = MessageIntentClassifier()
+        lm = DummyLM([{"requires_context": "N", "intent": "compliment", "category": "personal"}])
+
+        with dspy.context(lm=lm):
+            self._collect(classifier, "Love your latest reel!")
+            values = self._collect(classifier, "Love your latest reel!")
+
+        self.assertEqual(values[0], {"requires_context": False})
+        self.assertEqual(values[-1]["category"], "personal")
+
+    def test_astream_uses_semantic_cache(self):
+        """Test that astream answers a near-duplicate message from the semantic cache without streaming."""
+        vectors = {"Love your latest reel!": [1.0, 0.0], "love your latest reel": [0.99, 0.05]}
+        embedding_generator = MagicMock()
+        embedding_generator.generate_embedding.side_effect = lambda text: np.array(vectors[text])
+        classifier = MessageIntentClassifier(semantic_cache=SemanticCache(embedding_generator=embedding_generator))
+        lm = DummyLM([{"requires_context": "N", "intent": "compliment", "category": "personal"}])
+
+        with dspy.context(lm=lm):
+            self._collect(classifier, "Love your latest reel!")
+            values = self._collect(classifier, "love your latest reel")
+
+        self.assertEqual(len(lm.history), 1)
+        self.assertEqual(values[0], {"requires_context": False})
+        self.assertEqual(values[-1]["intent"], "compliment")
+
+    def test_analyzer_generates_requires_context_first(self):
+        """Test that streaming through an analyzer gets requires_context before the other outputs."""
+        self.assertEqual(next(iter(MessageAnalyze.output_fields)), "requires_context")
+
+class TestPredictedOutputs(unittest.TestCase):
+    def _call_with_model(self, qa_module, model):
+        mock_prediction = MagicMock()
+        mock_prediction.answer = "1937"
+        lm = MagicMock()
+        lm.model = model
+
+        with dspy.context(lm=lm), patch.object(qa_module, "predictor", return_value=mock_prediction) as mock_predictor:
+            mock_predictor.lm = None
+            qa_module(context="The bridge opened in 1937.", question="When did the bridge open?")
+        return mock_predictor.call_args.kwargs
+
+    def test_prediction_hint_sent_to_openai_models(self):
+        """Test that the context is passed as a predicted output for OpenAI models."""
+        kwargs = self._call_with_model(ContextQA(use_predicted_outputs=True), "openai/gpt-4o")
+
+        self.assertEqual(kwargs["config"], {
+            "prediction": {"type": "content", "content": "The bridge opened in 1937."}
+        })
+
+    def test_prediction_hint_skipped_for_other_models(self):
+        """Test that no predicted output is sent to providers that don't support it."""
+        kwargs = self._call_with_model(ContextQA(use_predicted_outputs=True), "anthropic/claude-3-5-sonnet-20241022")
+
+        self.assertNotIn("config", kwargs)
+
+    def test_prediction_hint_disabled_by_default(self):
+        """Test that predicted outputs are opt-in."""
+        kwargs = self._call_with_model(ContextQA(), "openai/gpt-4o")
+
+        self.assertNotIn("config", kwargs)
+
+class TestSemanticCache(unittest.TestCase):
+    def setUp(self):
+        # Embed texts as fixed vectors so similarity is predictable
+        self.vectors = {
+            "What is the capital of France?": [1.0, 0.0],
+            "what is the capital of france": [0.99, 0.05],
+            "How does photosynthesis work?": [0.0, 1.0],
+        }
+        self.mock_embedding_generator = MagicMock()
+        self.mock_embedding_generator.generate_embedding.side_effect = lambda text: np.array(self.vectors[text])
+        self.cache = SemanticCache(embedding_generator=self.mock_embedding_generator, threshold=0.92)
+
+    def test_get_returns_none_when_empty(self):
+        """Test that a lookup on an empty cache misses."""
+        embedding = self.cache.embed("What is the capital of France?")
+        self.assertIsNone(self.cache.get(embedding))
+
+    def test_get_returns_similar_entry(self):
+        """Test that a near-duplicate input hits the cached value."""
+        self.cache.put(self.cache.embed("What is the capital of France?"), "Paris")
+
+        self.assertEqual(self.cache.get(self.cache.embed("what is the capital of france")), "Paris")
+        self.assertIsNone(self.cache.get(self.cache.embed("How does photosynthesis work?")))
+
+    def test_namespaces_are_isolated(self):
+        """Test that entries in one namespace are not returned for another."""
+        embedding = self.cache.embed("What is the capital of France?")
+        self.cache.put(embedding, "Paris", namespace="context-a")
+
+        self.assertEqual(self.cache.get(embedding, namespace="context-a"), "Paris")
+        self.assertIsNone(self.cache.get(embedding, namespace="context-b"))
+
+    def test_max_entries_evicts_oldest(self):
+        """Test that the oldest entry is evicted when the cache is full."""
+        cache = SemanticCache(embedding_generator=self.mock_embedding_generator, max_entries=1)
+        cache.put(cache.embed("What is the capital of France?"), "Paris")
+        cache.put(cache.embed("How does photosynthesis work?"), "Light")
+
+        self.assertIsNone(cache.get(cache.embed("What is the capital of France?")))
+        self.assertEqual(cache.get(cache.embed("How does photosynthesis work?")), "Light")
+
+    def test_max_entries_bounds_all_namespaces(self):
+        """Test that max_entries caps the whole cache, evicting from the least recently used namespace."""
+        cache = SemanticCache(embedding_generator=self.mock_embedding_generator, max_entries=2)
+        france = cache.embed("What is the capital of France?")
+        photosynthesis = cache.embed("How does photosynthesis work?")
+        cache.put(france, "Paris", namespace="a")
+        cache.put(photosynthesis, "Light", namespace="b")
+        cache.get(france, namespace="a")
+        cache.put(france, "Lyon", namespace="c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(photosynthesis, namespace="b"))
+        self.assertEqual(cache.get(france, namespace="a"), "Paris")
+        self.assertEqual(cache.get(france, namespace="c"), "Lyon")
+
+    def test_modules_sharing_a_cache_do_not_see_each_others_results(self):
+        """Test that one cache shared by different modules keeps their results apart."""
+        qa_module = GeneralKnowledgeQA(semantic_cache=self.cache)
+        classifier = MessageIntentClassifier(semantic_cache=self.cache)
+        lm = DummyLM([
+            {"answer": "Paris"},
+            {"intent": "question", "category": "travel", "requires_context": "N"}
+        ])
+
+        with dspy.context(lm=lm):
+            qa_module(question="What is the capital of France?")
+            result = classifier(message="what is the capital of france")
+
+        self.assertEqual(result["intent"], "question")
+
+    def test_general_qa_uses_cache(self):
+        """Test that GeneralKnowledgeQA skips the predictor on a cache hit."""
+        qa_module = GeneralKnowledgeQA(semantic_cache=self.cache)
+        mock_prediction = MagicMock()
+        mock_prediction.answer = "Paris"
+
+        with patch.object(qa_module, "predictor", return_value=mock_prediction) as mock_predictor:
+            first = qa_module(question="What is the capital of France?")
+            second = qa_module(question="what is the capital of france")
+
+        self.assertEqual(mock_predictor.call_count, 1)
+        self.assertEqual(second["answer"], first["answer"])
+
+    def test_context_qa_keys_on_context(self):
+        """Test that ContextQA does not reuse answers across different contexts."""
+        qa_module = ContextQA(semantic_cache=self.cache)
+        mock_prediction = MagicMock()
+        mock_prediction.answer = "Paris"
+
+        with patch.object(qa_module, "predictor", return_value=mock_prediction) as mock_predictor:
+            qa_module(context="France facts", question="What is the capital of France?")
+            qa_module(context="Other facts", question="What is the capital of France?")
+
+        self.assertEqual(mock_predictor.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1 +1,188 @@
- 
\ No newline at end of file
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from src.rag.embeddings import EmbeddingGenerator
+from src.rag.document_processor import Document, DocumentChunk, content_hash
+
+class TestEmbeddingGenerator(unittest.TestCase):
+    def setUp(self):
+        # Stand in for the SentenceTransformer model: one 2-d embedding per text
+        self.generator = EmbeddingGenerator()
+        self.generator.model = MagicMock()
+        self.generator.model.encode.side_effect = lambda texts, **kwargs: np.array(
+            [[float(len(text)), 1.0] for text in texts]
+        )
+
+    def _document(self, doc_id, contents):
+        chunks = [
+            DocumentChunk(content=content, metadata={}, chunk_id=f"{doc_id}_chunk_{i}", chunk_index=i)
+            for i, content in enumerate(contents)
+        ]
+        return Document(content=" ".join(contents), doc_id=doc_id, chunks=chunks)
+
+    def test_embed_documents_uses_one_batch(self):
+        """Test that chunks of all documents are encoded in a single model call."""
+        documents = [
+            self._document("a", ["one", "three"]),
+            self._document("b", []),
+            self._document("c", ["seventeen"]),
+        ]
+        documents[1].content = ""
+
+        embedded = self.generator.embed_documents(documents)
+
+        self.generator.model.encode.assert_called_once()
+        self.assertEqual(self.generator.model.encode.call_args.args[0], ["one", "three", "seventeen"])
+        self.assertEqual([doc["doc_id"] for doc in embedded], ["a", "b", "c"])
+        self.assertEqual([chunk["chunk_id"] for chunk in embedded[0]["chunks"]], ["a_chunk_0", "a_chunk_1"])
+        self.assertEqual(embedded[1]["chunks"], [])
+        self.assertEqual(embedded[2]["chunks"][0]["embedding"][0], len("seventeen"))
+
+    def test_embedded_metadata_is_a_plain_dict(self):
+        """Test that embedded chunk and document metadata are mutable, serializable dict copies."""
+        document = Document(content="Line one\nLine two", metadata={"title": "Doc"}, doc_id="doc")
+
+        embedded = self.generator.embed_document(document)
+
+        for metadata in [embedded["metadata"]] + [chunk["metadata"] for chunk in embedded["chunks"]]:
+            self.assertIs(type(metadata), dict)
+            self.assertEqual(json.loads(json.dumps(metadata)), {"title": "Doc"})
+        embedded["chunks"][0]["metadata"]["title"] = "Changed"
+        embedded["metadata"]["title"] = "Changed"
+        self.assertEqual(document.metadata, {"title": "Doc"})
+
+    def test_chunk_embeddings_share_one_matrix(self):
+        """Test that chunk embeddings are float32 row views of one contiguous matrix."""
+        document = self._document("a", ["one", "three"])
+
+        embedded_chunks = self.generator.embed_document_chunks(document.chunks)
+
+        first, second = (chunk["embedding"] for chunk in embedded_chunks)
+        self.assertEqual(first.dtype, np.float32)
+        self.assertIs(first.base, second.base)
+        self.assertTrue(first.base.flags["C_CONTIGUOUS"])
+        self.assertEqual(first.base.shape, (2, 2))
+
+    def test_duplicate_chunks_are_embedded_once(self):
+        """Test that chunks with identical content are encoded once and share a row."""
+        documents = [
+            self._document("a", ["shared heading", "one"]),
+            self._document("b", ["shared heading"]),
+        ]
+
+        embedded = self.generator.embed_documents(documents)
+
+        self.assertEqual(self.generator.model.encode.call_args.args[0], ["shared heading", "one"])
+        first, second = embedded[0]["chunks"][0]["embedding"], embedded[1]["chunks"][0]["embedding"]
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(embedded[0]["chunks"][1]["embedding"][0], len("one"))
+
+    def test_generate_embeddings_uses_configured_batch_size(self):
+        """Test that generate_embeddings passes the configured batch size to the model."""
+        generator = EmbeddingGenerator(batch_size=256)
+        generator.model = self.generator.model
+
+        generator.generate_embeddings(["text"])
+
+        self.assertEqual(generator.model.encode.call_args.kwargs["batch_size"], 256)
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "embeddings.sqlite")
+        self.model = MagicMock()
+        self.model.encode.side_effect = lambda texts, **kwargs: np.array(
+            [[float(len(text)), 1.0] for text in texts]
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _generator(self, **kwargs):
+        generator = EmbeddingGenerator(embedding_cache_path=self.cache_path, **kwargs)
+        generator.model = self.model
+        self.addCleanup(generator.embedding_cache.close)
+        return generator
+
+    def test_cached_texts_are_not_re_encoded(self):
+        """Test that a later generator only encodes texts missing from the on-disk cache."""
+        first = self._generator().generate_embeddings(["one", "three"])
+        self.model.encode.reset_mock()
+
+        second = self._generator().generate_embeddings(["three", "seventeen", "one"])
+
+        self.assertEqual(self.model.encode.call_args.args[0], ["seventeen"])
+        np.testing.assert_array_equal(second, np.array([first[1], [9.0, 1.0], first[0]], dtype=np.float32))
+        self.assertEqual(second.dtype, np.float32)
+
+    def test_cache_is_usable_from_worker_threads(self):
+        """Test that a generator built on one thread can read and write its cache from others."""
+        generator = self._generator()
+        batches = [["one", "three"], ["three", "seventeen"], ["one", "seventeen"], ["five"]]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(generator.generate_embeddings, batches))
+
+        for batch, embeddings in zip(batches, results):
+            np.testing.assert_array_equal(embeddings[:, 0], [len(text) for text in batch])
+        texts = ["one", "three", "seventeen", "five"]
+        cached = generator.embedding_cache.get_many(generator._cache_namespace(), [content_hash(text) for text in texts])
+        self.assertEqual(len(cached), len(texts))
+
+    def test_cache_is_scoped_to_model_settings(self):
+        """Test that embeddings cached for one model are not served to another."""
+        self._generator().generate_embeddings(["one"])
+        self.model.encode.reset_mock()
+
+        self._generator(model_name="other-model").generate_embeddings(["one"])
+
+        self.model.encode.assert_called_once()
+
+class TestEmbeddingPrecision(unittest.TestCase):
+    @patch("src.rag.embeddings.SentenceTransformer")
+    def test_fp16_halves_model_on_cuda(self, mock_sentence_transformer):
+        """Test that fp16 precision converts the model to half precision on CUDA."""
+        generator = EmbeddingGenerator(device="cuda", precision="fp16")
+        generator.load_model()
+
+        mock_sentence_transformer.return_value.half.assert_called_once()
+
+    @patch("torch.ao.quantization.quantize_dynamic")
+    @patch("src.rag.embeddings.SentenceTransformer")
+    def test_int8_quantizes_model_on_cpu(self, mock_sentence_transformer, mock_quantize_dynamic):
+        """Test that int8 precision dynamically quantizes the model's linear layers on CPU."""
+        generator = EmbeddingGenerator(device="cpu", precision="int8")
+        generator.load_model()
+
+        mock_quantize_dynamic.assert_called_once()
+        self.assertIs(mock_quantize_dynamic.call_args.args[0], mock_sentence_transformer.return_value)
+        self.assertIs(generator.model, mock_quantize_dynamic.return_value)
+
+    @patch("src.rag.embeddings.SentenceTransformer")
+    def test_onnx_int8_loads_quantized_graph(self, mock_sentence_transformer):
+        """Test that the ONNX backend with int8 precision loads the VNNI-quantized graph on CPU."""
+        generator = EmbeddingGenerator(device="cpu", precision="int8", backend="onnx")
+        generator.load_model()
+
+        kwargs = mock_sentence_transformer.call_args.kwargs
+        self.assertEqual(kwargs["backend"], "onnx")
+        self.assertEqual(kwargs["model_kwargs"], {
+            "provider": "CPUExecutionProvider",
+            "file_name": "onnx/model_qint8_avx512_vnni.onnx",
+        })
+        self.assertIs(generator.model, mock_sentence_transformer.return_value)
+
+    def test_invalid_precision(self):
+        """Test that an unknown precision is rejected."""
+        with self.assertRaises(ValueError):
+            EmbeddingGenerator(precision="fp8")
+        with self.assertRaises(ValueError):
+            EmbeddingGenerator(backend="tensorrt")
+
+if __name__ == "__main__":
+    unittest.main()
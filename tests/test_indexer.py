@@ -0,0 +1,146 @@
+import unittest
+import numpy as np
+from unittest.mock import MagicMock, patch
+
+from src.rag.indexer import VectorStoreIndexer
+from src.rag.embeddings import EmbeddingGenerator
+from src.rag.document_processor import Document, DocumentChunk
+
+class TestVectorStoreIndexer(unittest.TestCase):
+    def setUp(self):
+        # Mock the collection so no vector store is created
+        self.indexer = VectorStoreIndexer()
+        self.mock_collection = MagicMock()
+        self.indexer.collection = self.mock_collection
+
+    def _document(self, doc_id, num_chunks):
+        metadata = {"title": doc_id}
+        chunks = [
+            DocumentChunk(content=f"{doc_id} {i}", metadata=metadata, chunk_id=f"{doc_id}_chunk_{i}", chunk_index=i)
+            for i in range(num_chunks)
+        ]
+        return Document(content=doc_id, metadata=metadata, doc_id=doc_id, chunks=chunks)
+
+    def test_index_documents_batches_across_documents(self):
+        """Test that chunks of several documents are added in shared batches."""
+        documents = [self._document("a", 2), self._document("b", 3), self._document("c", 1)]
+
+        self.indexer.index_documents(documents, batch_size=4)
+
+        calls = self.mock_collection.add.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0].kwargs["ids"], ["a_chunk_0", "a_chunk_1", "b_chunk_0", "b_chunk_1"])
+        self.assertEqual(calls[1].kwargs["ids"], ["b_chunk_2", "c_chunk_0"])
+        self.assertNotIn("embeddings", calls[0].kwargs)
+        self.assertEqual([metadata["chunk_index"] for metadata in calls[0].kwargs["metadatas"]], [0, 1, 0, 1])
+        self.assertEqual(documents[0].metadata, {"title": "a"})
+        self.assertEqual(
+            calls[1].kwargs["metadatas"][1],
+            {"title": "c", "chunk_index": 0, "source_file": "", "doc_id": "c"}
+        )
+
+    def test_index_documents_with_embedding_generator(self):
+        """Test that embeddings stay aligned with their chunks across batches."""
+        generator = MagicMock(spec=EmbeddingGenerator)
+        generator.generate_embeddings.side_effect = lambda texts: np.array(
+            [[float(text[-1]), 1.0] for text in texts], dtype=np.float32
+        )
+        documents = [self._document("a", 3), self._document("b", 1)]
+
+        self.indexer.index_documents(documents, embedding_generator=generator, batch_size=2)
+
+        # The chunks of all documents are embedded in a single call
+        generator.generate_embeddings.assert_called_once_with(["a 0", "a 1", "a 2", "b 0"])
+        calls = self.mock_collection.add.call_args_list
+        self.assertEqual([call.kwargs["ids"] for call in calls], [["a_chunk_0", "a_chunk_1"], ["a_chunk_2", "b_chunk_0"]])
+        embeddings = calls[1].kwargs["embeddings"]
+        self.assertEqual(embeddings.dtype, np.float32)
+        np.testing.assert_array_equal(embeddings, [[2.0, 1.0], [0.0, 1.0]])
+
+    def test_index_documents_with_threads(self):
+        """Test that batches submitted from a thread pool still cover every chunk once."""
+        self.indexer.num_threads = 4
+        documents = [self._document(doc_id, 3) for doc_id in "abcde"]
+
+        self.indexer.index_documents(documents, batch_size=2)
+
+        added = [chunk_id for call in self.mock_collection.add.call_args_list for chunk_id in call.kwargs["ids"]]
+        self.assertEqual(self.mock_collection.add.call_count, 8)
+        self.assertCountEqual(added, [chunk.chunk_id for document in documents for chunk in document.chunks])
+
+    def test_get_collection_sets_hnsw_parameters(self):
+        """Test that the collection is created with the configured HNSW parameters."""
+        indexer = VectorStoreIndexer(hnsw_M=32, hnsw_construction_ef=400, hnsw_search_ef=50)
+        indexer.client = MagicMock()
+        indexer.embedding_function_name = None
+
+        indexer._get_collection()
+
+        indexer.client.get_or_create_collection.assert_called_once_with(
+            name="instagram_chatbot",
+            embedding_function=None,
+            metadata={"hnsw:space": "cosine", "hnsw:M": 32, "hnsw:construction_ef": 400, "hnsw:search_ef": 50}
+        )
+        self.assertIs(indexer.collection, indexer.client.get_or_create_collection.return_value)
+
+    def test_buffered_mode_defers_and_searches_chunks(self):
+        """Test that buffered chunks are searchable before a single flushing add()."""
+        generator = MagicMock(spec=EmbeddingGenerator)
+        generator.generate_embeddings.side_effect = lambda texts: np.array(
+            [[1.0, float(text[-1])] for text in texts], dtype=np.float32
+        )
+        self.indexer.enable_buffered_mode(threshold=5)
+
+        self.indexer.index_documents([self._document("a", 2)], embedding_generator=generator)
+        self.indexer.index_documents([self._document("b", 2)], embedding_generator=generator)
+        self.mock_collection.add.assert_not_called()
+
+        results = self.indexer.search_buffer(np.array([1.0, 1.0]), n_results=2, where={"doc_id": {"$in": ["a"]}})
+        self.assertEqual(results["ids"], [["a_chunk_1", "a_chunk_0"]])
+        self.assertAlmostEqual(results["distances"][0][0], 0.0, places=6)
+
+        self.indexer.delete_documents(["b"])
+        self.indexer.index_documents([self._document("c", 3)], embedding_generator=generator)
+
+        self.mock_collection.add.assert_called_once()
+        self.assertEqual(
+            self.mock_collection.add.call_args.kwargs["ids"],
+            ["a_chunk_0", "a_chunk_1", "c_chunk_0", "c_chunk_1", "c_chunk_2"]
+        )
+        self.assertIsNone(self.indexer.search_buffer(np.array([1.0, 1.0]), n_results=2))
+
+    @patch("src.rag.indexer._DELETE_BATCH_SIZE", 2)
+    def test_delete_documents_uses_in_filter(self):
+        """Test that documents are deleted in groups with one $in filter per group."""
+        self.indexer.delete_documents(["a", "b", "c"])
+
+        self.assertEqual(
+            [call.kwargs["where"] for call in self.mock_collection.delete.call_args_list],
+            [{"doc_id": {"$in": ["a", "b"]}}, {"doc_id": {"$in": ["c"]}}]
+        )
+
+    @patch("src.rag.indexer._STATS_PAGE_SIZE", 2)
+    def test_get_collection_stats_pages_metadata(self):
+        """Test that collection statistics are accumulated page by page."""
+        metadatas = [
+            {"doc_id": "a", "category": "faq", "content_type": "text"},
+            {"doc_id": "a", "category": "faq"},
+            {"doc_id": "b", "category": "policy", "content_type": "text"},
+        ]
+        self.mock_collection.count.return_value = len(metadatas)
+        self.mock_collection.get.side_effect = lambda include, limit, offset: {
+            "metadatas": metadatas[offset:offset + limit]
+        }
+
+        stats = self.indexer.get_collection_stats()
+
+        self.assertEqual([call.kwargs["offset"] for call in self.mock_collection.get.call_args_list], [0, 2])
+        self.assertEqual(stats, {
+            "total_chunks": 3,
+            "total_documents": 2,
+            "content_types": {"text": 2},
+            "categories": {"faq": 2, "policy": 1}
+        })
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,31 @@
-import os
-import sys
 import unittest
-from unittest.mock import patch, MagicMock
-
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tiktoken
+import numpy as np
+from unittest.mock import ANY, create_autospec, patch, MagicMock
 
 from src.rag.retriever import QueryTransformer, Retriever
 from src.rag.indexer import VectorStoreIndexer
 from src.rag.embeddings import EmbeddingGenerator
 
+# Collection query results shared by reference; the retriever only reads them
+_QUERY_RESULT_TWO = {
+    "ids": [["chunk1", "chunk2"]],
+    "distances": [[0.1, 0.2]],
+    "metadatas": [[{"title": "Test 1"}, {"title": "Test 2"}]],
+    "documents": [["Content 1", "Content 2"]]
+}
+_QUERY_RESULT_EMPTY = {"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]}
+
+# Formatted retrieve() output for _QUERY_RESULT_TWO
+_EXPECTED_TWO = [
+    {"chunk_id": "chunk1", "similarity_score": 0.9, "metadata": {"title": "Test 1"}, "content": "Content 1"},
+    {"chunk_id": "chunk2", "similarity_score": 0.8, "metadata": {"title": "Test 2"}, "content": "Content 2"}
+]
+
+# Random collection distances shared by the threshold oracle test
+_ORACLE_DISTANCES = np.random.default_rng(0).random(64)
+_ORACLE_IDS = [f"c{i}" for i in range(len(_ORACLE_DISTANCES))]
+
 class TestQueryTransformer(unittest.TestCase):
     def test_transform_query(self):
         """Test that the query transformer returns the original query."""
@@ -19,121 +35,200 @@ class TestQueryTransformer(unittest.TestCase):
         self.assertEqual(transformed_query, query)
 
 class TestRetriever(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Autospecced mocks introspect their class when built, so build them once and reset them per test
+        cls._indexer_mock = create_autospec(VectorStoreIndexer, instance=True)
+        cls._embedding_generator_mock = create_autospec(EmbeddingGenerator, instance=True)
+    
     def setUp(self):
         # Mock the indexer and its collection
-        self.mock_indexer = MagicMock(spec=VectorStoreIndexer)
+        self.mock_indexer = self._indexer_mock
+        self.mock_indexer.reset_mock(return_value=True, side_effect=True)
         self.mock_collection = MagicMock()
         self.mock_indexer.collection = self.mock_collection
+        self.mock_indexer.search_buffer.return_value = None
         
         # Mock the embedding generator
-        self.mock_embedding_generator = MagicMock(spec=EmbeddingGenerator)
+        self.mock_embedding_generator = self._embedding_generator_mock
+        self.mock_embedding_generator.reset_mock(return_value=True, side_effect=True)
         
         # Create a retriever with the mocks
-        self.retriever = Retriever(
+        self.retriever = self._retriever(self.mock_embedding_generator)
+    
+    def _retriever(self, embedding_generator):
+        return Retriever(
             indexer=self.mock_indexer,
-            embedding_generator=self.mock_embedding_generator,
+            embedding_generator=embedding_generator,
             max_results=3,
             similarity_threshold=0.7
         )
     
-    def test_retrieve_with_embedding_generator(self):
-        """Test retrieving with an embedding generator."""
-        # Set up the mock embedding generator
+    def test_retrieve_with_and_without_embedding_generator(self):
+        """Test that retrieve queries by embedding when it has a generator and by text otherwise."""
         mock_embedding = [0.1, 0.2, 0.3]
         self.mock_embedding_generator.generate_embedding.return_value = mock_embedding
         
-        # Set up the mock collection
-        self.mock_collection.query.return_value = {
-            "ids": [["chunk1", "chunk2"]],
-            "distances": [[0.1, 0.2]],
-            "metadatas": [[{"title": "Test 1"}, {"title": "Test 2"}]],
-            "documents": [["Content 1", "Content 2"]]
-        }
+        cases = [
+            ("with embedding generator", self.mock_embedding_generator, {"query_embeddings": [mock_embedding]}),
+            ("without embedding generator", None, {"query_texts": ["test query"]})
+        ]
+        for name, embedding_generator, query_kwargs in cases:
+            with self.subTest(name):
+                self.mock_collection.query.reset_mock()
+                self.mock_collection.query.return_value = _QUERY_RESULT_TWO
+                retriever = self._retriever(embedding_generator)
+                
+                # Call retrieve
+                results = retriever.retrieve(
+                    query="test query",
+                    filter_criteria={"category": "test"}
+                )
+                
+                # Check that the collection was queried
+                self.assertEqual(self.mock_collection.query.call_count, 1)
+                self.assertEqual(self.mock_collection.query.call_args.kwargs, {
+                    **query_kwargs,
+                    "n_results": 3,
+                    "where": {"category": "test"},
+                    "include": ["distances", "metadatas", "documents"]
+                })
+                
+                # Check the results; similarity is 1 - distance
+                self.assertEqual(results, _EXPECTED_TWO)
         
-        # Call retrieve
-        results = self.retriever.retrieve(
-            query="test query",
-            filter_criteria={"category": "test"}
-        )
+        # Only the retriever with a generator embeds the query
+        self.assertEqual(self.mock_embedding_generator.generate_embedding.call_count, 1)
+        self.assertEqual(self.mock_embedding_generator.generate_embedding.call_args.args, ("test query",))
+    
+    def test_query_embeddings_are_cached(self):
+        """Test that a repeated query reuses its embedding instead of re-running the model."""
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
+        self.mock_collection.query.return_value = _QUERY_RESULT_EMPTY
         
-        # Check that the embedding generator was called
-        self.mock_embedding_generator.generate_embedding.assert_called_once_with("test query")
+        self.retriever.retrieve(query="test query")
+        self.retriever.retrieve(query="test query")
         
-        # Check that the collection was queried
-        self.mock_collection.query.assert_called_once_with(
-            query_embeddings=[mock_embedding],
-            n_results=3,
-            where={"category": "test"},
-            include=["metadatas", "documents"]
-        )
+        self.mock_embedding_generator.generate_embedding.assert_called_once_with("test query")
+        self.assertEqual(self.mock_collection.query.call_count, 2)
+        self.assertEqual(self.retriever.cache_info().hits, 1)
         
-        # Check the results
-        self.assertEqual(len(results), 2)
-        self.assertEqual(results[0]["chunk_id"], "chunk1")
-        self.assertEqual(results[0]["similarity_score"], 0.9)  # 1 - 0.1
-        self.assertEqual(results[0]["metadata"], {"title": "Test 1"})
-        self.assertEqual(results[0]["content"], "Content 1")
+        self.retriever.clear_cache()
+        self.retriever.retrieve(query="test query")
+        self.assertEqual(self.mock_embedding_generator.generate_embedding.call_count, 2)
     
-    def test_retrieve_without_embedding_generator(self):
-        """Test retrieving without an embedding generator."""
-        # Create a retriever without an embedding generator
-        retriever = Retriever(
-            indexer=self.mock_indexer,
-            embedding_generator=None,
-            max_results=3,
-            similarity_threshold=0.7
-        )
+    def test_retrieve_passes_numpy_query_embedding(self):
+        """Test that a NumPy query embedding reaches the collection without list conversion."""
+        mock_embedding = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+        self.mock_embedding_generator.generate_embedding.return_value = mock_embedding
+        self.mock_collection.query.return_value = _QUERY_RESULT_EMPTY
         
-        # Set up the mock collection
+        self.retriever.retrieve(query="test query")
+        
+        query_embeddings = self.mock_collection.query.call_args.kwargs["query_embeddings"]
+        self.assertIs(query_embeddings[0], mock_embedding)
+        self.assertFalse(mock_embedding.flags.writeable)
+    
+    def test_retrieve_merges_buffered_chunks(self):
+        """Test that buffered chunks are ranked together with collection results."""
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
         self.mock_collection.query.return_value = {
-            "ids": [["chunk1", "chunk2"]],
-            "distances": [[0.1, 0.2]],
-            "metadatas": [[{"title": "Test 1"}, {"title": "Test 2"}]],
-            "documents": [["Content 1", "Content 2"]]
+            "ids": [["chunk1", "chunk3"]],
+            "distances": [[0.1, 0.25]],
+            "metadatas": [[{"title": "Test 1"}, {"title": "Test 3"}]],
+            "documents": [["Content 1", "Content 3"]]
+        }
+        self.mock_indexer.search_buffer.return_value = {
+            "ids": [["buffered"]],
+            "distances": [[0.2]],
+            "metadatas": [[{"title": "Buffered"}]],
+            "documents": [["Buffered content"]]
         }
         
-        # Call retrieve
-        results = retriever.retrieve(
-            query="test query",
-            filter_criteria={"category": "test"}
-        )
-        
-        # Check that the collection was queried
-        self.mock_collection.query.assert_called_once_with(
-            query_texts=["test query"],
-            n_results=3,
-            where={"category": "test"},
-            include=["metadatas", "documents"]
-        )
+        results = self.retriever.retrieve(query="test query", filter_criteria={"category": "test"})
         
-        # Check the results
-        self.assertEqual(len(results), 2)
+        self.mock_indexer.search_buffer.assert_called_once_with([0.1, 0.2, 0.3], 3, {"category": "test"})
+        self.assertEqual([result["chunk_id"] for result in results], ["chunk1", "buffered", "chunk3"])
+        self.assertEqual(results[1]["content"], "Buffered content")
     
-    def test_filter_by_similarity_threshold(self):
-        """Test filtering results by similarity threshold."""
-        # Set up the mock embedding generator
-        mock_embedding = [0.1, 0.2, 0.3]
-        self.mock_embedding_generator.generate_embedding.return_value = mock_embedding
+    def test_retrieve_without_embedding_generator_flushes_buffer_first(self):
+        """Test that a text query flushes buffered chunks into the collection before querying."""
+        self.mock_collection.query.return_value = _QUERY_RESULT_TWO
+        calls = MagicMock()
+        calls.attach_mock(self.mock_indexer.flush, "flush")
+        calls.attach_mock(self.mock_collection.query, "query")
+        
+        self._retriever(None).retrieve(query="test query")
+        
+        self.assertEqual([name for name, _, _ in calls.mock_calls], ["flush", "query"])
+        self.mock_indexer.search_buffer.assert_not_called()
         
-        # Set up the mock collection with a result below threshold
+        # With a generator the buffer is scanned in place and left alone
+        self.mock_indexer.flush.reset_mock()
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
+        self.retriever.retrieve(query="test query")
+        self.mock_indexer.flush.assert_not_called()
+    
+    def test_retrieve_without_metadata_or_documents(self):
+        """Test that results skip metadata and content that were not requested."""
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
         self.mock_collection.query.return_value = {
-            "ids": [["chunk1", "chunk2", "chunk3"]],
-            "distances": [[0.1, 0.2, 0.4]],  # 0.4 distance = 0.6 similarity, below threshold
-            "metadatas": [[{"title": "Test 1"}, {"title": "Test 2"}, {"title": "Test 3"}]],
-            "documents": [["Content 1", "Content 2", "Content 3"]]
+            "ids": [["chunk1"]],
+            "distances": [[0.1]],
+            "metadatas": None,
+            "documents": None
         }
         
-        # Call retrieve
-        results = self.retriever.retrieve(
-            query="test query"
-        )
+        results = self.retriever.retrieve(query="test query", include_metadata=False, include_documents=False)
         
-        # Check that only results above threshold are returned
-        self.assertEqual(len(results), 2)  # Only chunk1 and chunk2 should be returned
-        chunk_ids = [result["chunk_id"] for result in results]
-        self.assertIn("chunk1", chunk_ids)
-        self.assertIn("chunk2", chunk_ids)
-        self.assertNotIn("chunk3", chunk_ids)
+        self.assertEqual(self.mock_collection.query.call_args.kwargs["include"], ["distances"])
+        self.assertEqual(results, [{"chunk_id": "chunk1", "similarity_score": 0.9, "metadata": {}, "content": ""}])
+    
+    def test_retrieve_filters_by_similarity_threshold(self):
+        """Test that only results at or above the similarity threshold are returned, in order."""
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
+        
+        # Collection distances and the chunk ids expected to survive the 0.7 threshold
+        cases = [
+            ("all above threshold", [0.1, 0.2], ["chunk1", "chunk2"]),
+            ("one below threshold", [0.1, 0.2, 0.4], ["chunk1", "chunk2"]),  # 0.4 distance = 0.6 similarity
+            ("exactly at threshold", [0.25, 0.3], ["chunk1", "chunk2"]),
+            ("all below threshold", [0.35, 0.5], []),
+            ("no results", [], [])
+        ]
+        for name, distances, expected_ids in cases:
+            with self.subTest(name):
+                ids = [f"chunk{i + 1}" for i in range(len(distances))]
+                self.mock_collection.query.return_value = {
+                    "ids": [ids],
+                    "distances": [distances],
+                    "metadatas": [[{"title": f"Test {i + 1}"} for i in range(len(distances))]],
+                    "documents": [[f"Content {i + 1}" for i in range(len(distances))]]
+                }
+                
+                results = self.retriever.retrieve(query="test query")
+                
+                self.assertEqual([result["chunk_id"] for result in results], expected_ids)
+    
+    def test_similarity_threshold_matches_numpy_oracle(self):
+        """Test threshold filtering of a random batch against a vectorized NumPy oracle."""
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
+        self.mock_collection.query.return_value = {
+            "ids": [_ORACLE_IDS],
+            "distances": [_ORACLE_DISTANCES.tolist()],
+            "metadatas": [[{}] * len(_ORACLE_IDS)],
+            "documents": [[""] * len(_ORACLE_IDS)]
+        }
+        similarities = 1.0 - _ORACLE_DISTANCES
+        
+        for threshold in [0.5, 0.7, 0.9]:
+            with self.subTest(threshold=threshold):
+                self.retriever.similarity_threshold = threshold
+                
+                results = self.retriever.retrieve(query="test query")
+                
+                expected_ids = np.array(_ORACLE_IDS)[similarities >= threshold].tolist()
+                self.assertEqual([result["chunk_id"] for result in results], expected_ids)
     
     def test_retrieve_and_build_context(self):
         """Test retrieving and building context."""
@@ -159,35 +254,52 @@ class TestRetriever(unittest.TestCase):
             max_tokens=1000
         )
         
-        # Check the context
-        self.assertEqual(context["context"], "Content 1\n\nContent 2")
-        self.assertEqual(len(context["sources"]), 2)
-        self.assertEqual(context["sources"][0]["doc_id"], "doc1")
-        self.assertEqual(context["sources"][0]["title"], "Test 1")
-        self.assertEqual(context["sources"][1]["doc_id"], "doc2")
-        self.assertEqual(context["chunks_used"], 2)
+        # Check the context; the token total depends on which tokenizer is available
+        self.assertEqual(context, {
+            "context": "Content 1\n\nContent 2",
+            "sources": [
+                {"chunk_id": "chunk1", "similarity_score": 0.9, "title": "Test 1", "source": "Source 1", "doc_id": "doc1"},
+                {"chunk_id": "chunk2", "similarity_score": 0.8, "title": "Test 2", "source": "Source 2", "doc_id": "doc2"}
+            ],
+            "query": "test query",
+            "chunks_used": 2,
+            "total_tokens": ANY
+        })
     
-    def test_empty_results(self):
-        """Test handling empty results."""
+    def test_build_context_counts_tokens_with_tokenizer(self):
+        """Test that the context keeps the longest prefix of chunks within max_tokens."""
+        self.mock_embedding_generator.generate_embedding.return_value = [0.1, 0.2, 0.3]
+        self.mock_collection.query.return_value = {
+            "ids": [["chunk1", "chunk2", "chunk3"]],
+            "distances": [[0.1, 0.2, 0.25]],
+            "metadatas": [[{"doc_id": "doc1"}, {"doc_id": "doc2"}, {"doc_id": "doc3"}]],
+            "documents": [["a" * 10, "b" * 10, "c"]]
+        }
+        # Byte-level encoding built offline: one token per byte
+        encoding = tiktoken.Encoding(
+            name="bytes",
+            pat_str=r"\S+|\s+",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={}
+        )
+        
+        with patch("src.rag.retriever._default_encoding", return_value=encoding):
+            context = self.retriever.retrieve_and_build_context(query="test query", max_tokens=15)
+        
+        # The third chunk would fit on its own but the context stops at the first overflow
+        self.assertEqual(context["context"], "a" * 10)
+        self.assertEqual(context["chunks_used"], 1)
+        self.assertEqual(context["total_tokens"], 10)
+        self.assertEqual([source["doc_id"] for source in context["sources"]], ["doc1"])
+    
+    def test_empty_context(self):
+        """Test building a context when no chunks are retrieved."""
         # Set up the mock embedding generator
         mock_embedding = [0.1, 0.2, 0.3]
         self.mock_embedding_generator.generate_embedding.return_value = mock_embedding
         
         # Set up the mock collection with empty results
-        self.mock_collection.query.return_value = {
-            "ids": [[]],
-            "distances": [[]],
-            "metadatas": [[]],
-            "documents": [[]]
-        }
-        
-        # Call retrieve
-        results = self.retriever.retrieve(
-            query="test query"
-        )
-        
-        # Check that empty results are handled
-        self.assertEqual(len(results), 0)
+        self.mock_collection.query.return_value = _QUERY_RESULT_EMPTY
         
         # Call retrieve_and_build_context
         context = self.retriever.retrieve_and_build_context(
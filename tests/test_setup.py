@@ -1,81 +1,160 @@
+import contextlib
 import os
-import sys
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
-# Add the src directory to the path so we can import our modules
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-from src.utils.setup import load_environment, init_dspy, get_llm
+import src.utils.setup as setup_mod
+from src.utils.setup import load_environment, init_dspy, get_llm, _parse_env_file
 
 class TestSetup(unittest.TestCase):
-    @patch('src.utils.setup.load_dotenv')
-    def test_load_environment_success(self, mock_load_dotenv):
-        """Test that load_environment calls load_dotenv"""
-        with patch.dict(os.environ, {
+    @classmethod
+    def setUpClass(cls):
+        """Isolate the class from the developer's DSPY_VERBOSE; the environment is restored afterwards."""
+        cls._env_patcher = patch.dict(os.environ)
+        cls._env_patcher.start()
+        os.environ.pop('DSPY_VERBOSE', None)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls._env_patcher.stop()
+    
+    def setUp(self):
+        # _parse_env_file is lru_cached; never let a parse from one test leak into another
+        setup_mod._parse_env_file.cache_clear()
+        self.addCleanup(setup_mod._parse_env_file.cache_clear)
+        
+        # Patch the module's collaborators once per test; the functions under test are the
+        # originals imported above, so each test only sees the mocks of what it calls into
+        self._stack = contextlib.ExitStack()
+        self.mock_dspy = self._stack.enter_context(patch.object(setup_mod, 'dspy'))
+        self.mock_read_env_file = self._stack.enter_context(patch.object(setup_mod, 'read_env_file'))
+        self.mock_load_environment = self._stack.enter_context(patch.object(setup_mod, 'load_environment'))
+        self.mock_init_dspy = self._stack.enter_context(patch.object(setup_mod, 'init_dspy'))
+    
+    def tearDown(self):
+        self._stack.close()
+    
+    def test_load_environment_success(self):
+        """Test that load_environment returns the variables read from .env"""
+        self.mock_read_env_file.return_value = {
             'ANTHROPIC_API_KEY': 'test_key',
             'ANTHROPIC_MODEL': 'test_model'
-        }):
-            load_environment()
-            mock_load_dotenv.assert_called_once()
+        }
+        
+        env_vars = load_environment()
+        
+        self.mock_read_env_file.assert_called_once()
+        self.assertEqual(env_vars, self.mock_read_env_file.return_value)
     
-    @patch('src.utils.setup.load_dotenv')
-    def test_load_environment_missing_vars(self, mock_load_dotenv):
+    def test_load_environment_missing_vars(self):
         """Test that load_environment raises an error when environment variables are missing"""
-        with patch.dict(os.environ, {}, clear=True):
-            with self.assertRaises(EnvironmentError):
-                load_environment()
+        self.mock_read_env_file.return_value = {'ANTHROPIC_MODEL': 'test_model'}
+        
+        with self.assertRaisesRegex(EnvironmentError, 'ANTHROPIC_API_KEY'):
+            load_environment()
     
-    @patch('src.utils.setup.dspy.LM')
-    @patch('src.utils.setup.load_environment')
-    def test_init_dspy(self, mock_load_environment, mock_lm):
-        """Test that init_dspy initializes DSPy with the correct parameters"""
-        mock_llm = MagicMock()
-        mock_lm.return_value = mock_llm
+    def test_parse_env_file(self):
+        """Test that .env lines are parsed into stripped key/value pairs and cached"""
+        with tempfile.NamedTemporaryFile('w', suffix='.env', delete=False) as f:
+            f.write("# comment\n\nANTHROPIC_MODEL = claude\nANTHROPIC_API_KEY=a=b\nnot a pair\n")
+        self.addCleanup(os.remove, f.name)
+        
+        env_vars = _parse_env_file(f.name)
         
-        with patch.dict(os.environ, {
+        self.assertEqual(env_vars, {'ANTHROPIC_MODEL': 'claude', 'ANTHROPIC_API_KEY': 'a=b'})
+        self.assertIs(_parse_env_file(f.name), env_vars)
+    
+    def test_init_dspy(self):
+        """Test that init_dspy initializes DSPy with the correct parameters"""
+        self.mock_load_environment.return_value = {
             'ANTHROPIC_API_KEY': 'test_key',
             'ANTHROPIC_MODEL': 'test_model',
             'DSPY_VERBOSE': 'True'
-        }):
+        }
+        
+        with patch('builtins.print'):
             result = init_dspy()
-            
-            mock_load_environment.assert_called_once()
-            mock_lm.assert_called_once_with(
-                "test_model",
-                api_key='test_key'
-            )
-            self.assertEqual(result, mock_llm)
+        
+        self.mock_load_environment.assert_called_once()
+        self.mock_dspy.LM.assert_called_once_with(
+            "test_model",
+            api_key='test_key'
+        )
+        self.mock_dspy.configure.assert_called_once_with(lm=self.mock_dspy.LM.return_value, verbose=True)
+        self.assertEqual(result, self.mock_dspy.LM.return_value)
+    
+    def test_init_dspy_passes_no_provider_specific_options(self):
+        """Test that init_dspy configures Anthropic models with only the model name and key"""
+        self.mock_load_environment.return_value = {
+            'ANTHROPIC_API_KEY': 'test_key_123456',
+            'ANTHROPIC_MODEL': 'anthropic/claude-3-5-sonnet-20241022'
+        }
+        
+        init_dspy(verbose=False)
+        
+        self.mock_dspy.LM.assert_called_once_with(
+            'anthropic/claude-3-5-sonnet-20241022',
+            api_key='test_key_123456'
+        )
     
-    @patch('src.utils.setup.init_dspy')
-    @patch('src.utils.setup.dspy')
-    def test_get_llm_initialization(self, mock_dspy, mock_init_dspy):
+    @patch.dict(os.environ, {'DSPY_VERBOSE': 'false'})
+    def test_init_dspy_verbose_env_overrides_env_file(self):
+        """Test that the DSPY_VERBOSE environment variable takes precedence over .env"""
+        self.mock_load_environment.return_value = {
+            'ANTHROPIC_API_KEY': 'test_key_123456',
+            'ANTHROPIC_MODEL': 'anthropic/claude-3-5-sonnet-20241022',
+            'DSPY_VERBOSE': 'True'
+        }
+        
+        init_dspy()
+        
+        self.mock_dspy.configure.assert_called_once_with(lm=self.mock_dspy.LM.return_value, verbose=False)
+    
+    def test_get_llm_initialization(self):
         """Test that get_llm initializes the LLM if not already initialized"""
         # Simulate uninitialized settings
-        mock_dspy.settings = MagicMock()
-        delattr(mock_dspy.settings, 'lm')
+        self.mock_dspy.settings = MagicMock()
+        delattr(self.mock_dspy.settings, 'lm')
         
         mock_llm = MagicMock()
-        mock_init_dspy.return_value = mock_llm
+        self.mock_init_dspy.return_value = mock_llm
         
         result = get_llm()
         
-        mock_init_dspy.assert_called_once()
+        self.mock_init_dspy.assert_called_once()
         self.assertEqual(result, mock_llm)
     
-    @patch('src.utils.setup.init_dspy')
-    @patch('src.utils.setup.dspy')
-    def test_get_llm_already_initialized(self, mock_dspy, mock_init_dspy):
+    def test_get_llm_already_initialized(self):
         """Test that get_llm returns the existing LLM if already initialized"""
         # Simulate initialized settings
         mock_llm = MagicMock()
-        mock_dspy.settings = MagicMock()
-        mock_dspy.settings.lm = mock_llm
+        self.mock_dspy.settings = MagicMock()
+        self.mock_dspy.settings.lm = mock_llm
         
         result = get_llm()
         
-        mock_init_dspy.assert_not_called()
+        self.mock_init_dspy.assert_not_called()
         self.assertEqual(result, mock_llm)
 
+    def test_get_llm_initializes_once_across_threads(self):
+        """Test that concurrent first calls to get_llm initialize DSPy only once"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        self.mock_dspy.settings = MagicMock()
+        self.mock_dspy.settings.lm = None
+        mock_llm = MagicMock()
+        
+        def configure():
+            self.mock_dspy.settings.lm = mock_llm
+            return mock_llm
+        self.mock_init_dspy.side_effect = configure
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: get_llm(), range(16)))
+        
+        self.mock_init_dspy.assert_called_once()
+        self.assertTrue(all(result is mock_llm for result in results))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file